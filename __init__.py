@@ -27,10 +27,14 @@
 #########################################################################
 
 import colorsys
+import hashlib
+import json
 import math
 import os
 import queue
 import sys
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
 import yaml
@@ -38,7 +42,14 @@ from lib.item import Items
 from lib.model.mqttplugin import MqttPlugin
 from lib.shtime import Shtime
 
+from . import nspanel_chart
+from . import nspanel_config
+from . import nspanel_engine
+from . import nspanel_event
+from . import nspanel_frame
 from . import nspanel_icons_colors
+from . import nspanel_render
+from . import nspanel_telemetry
 from .webif import WebInterface
 
 Icons = nspanel_icons_colors.IconsSelector()
@@ -68,6 +79,12 @@ class NSPanel(MqttPlugin):
 
         self.shtime = Shtime.get_instance()
         self.items = Items.get_instance()
+        self.item_index = nspanel_render.ItemIndex(self.items.return_item)
+        self.render_context = None
+        self.render_transaction = None
+        self.last_values = {}
+        self.pending_writes = {}
+        self.value_formats = nspanel_render.FormatCache()
 
         # get the parameters for the plugin (as defined in metadata plugin.yaml):
         try:
@@ -75,6 +92,11 @@ class NSPanel(MqttPlugin):
             self.tasmota_topic = self.get_parameter_value('topic')
             self.telemetry_period = self.get_parameter_value('telemetry_period')
             self.config_file_location = self.get_parameter_value('config_file_location')
+            self.config_reload_cycle = self.get_parameter_value('config_reload_cycle')
+            self.engine = self.get_parameter_value('engine')
+            self.button_double_press_time = self.get_parameter_value('button_double_press_time')
+            self.button_long_press_time = self.get_parameter_value('button_long_press_time')
+            self.optimistic_timeout = self.get_parameter_value('optimistic_timeout')
             self.full_topic = self.get_parameter_value('full_topic').lower()
             self.desired_panel_model = self.get_parameter_value('model')
             self.firmware_check = self.get_parameter_value('firmware_check')
@@ -84,6 +106,7 @@ class NSPanel(MqttPlugin):
             self.defaultColor = self.get_parameter_value('defaultColor')
             self.defaultOffColor = self.get_parameter_value('defaultOffColor')
             self.defaultOnColor = self.get_parameter_value('defaultOnColor')
+            self.language = self.get_parameter_value('language')
             # TODO check if colors are valid otherwise use existing
             pass
         except KeyError as e:
@@ -101,17 +124,35 @@ class NSPanel(MqttPlugin):
 
         # define properties
         self.current_page = 1
+        self.page_stack = []
+        self.displayed_page = None
+        self.dirty_pages = set()
+        self.dirty_relays = {}
         self.panel_status = {'online': False, 'online_timeout': datetime.now(), 'uptime': '-', 'sensors': {},
                              'relay': {}, 'screensaver_active': False}
         self.custom_msg_queue = queue.Queue(maxsize=50)  # Queue containing last 50 messages containing "CustomRecv"
         self.panel_items = {}
-        self.panel_config_items = []
+        self.panel_config_items = {}
         self.panel_config_items_page = {}
+        self.config_file_mtime = None
         self.berry_driver_version = 0
+        self.version_check_pending = False
         self.display_firmware_version = 0
         self.panel_model = ''
         self.alive = None
-        self.lastPayload = []
+        self.frame_cache = nspanel_frame.FrameCache()
+        self.series_cache = nspanel_chart.SeriesCache()
+        if self.engine == 'asyncio':
+            self.actor = nspanel_engine.AsyncioPanelEngine(f"plugins.{self.get_fullname()}.engine", self.logger)
+        else:
+            self.actor = nspanel_engine.PanelActor(f"plugins.{self.get_fullname()}.actor", self.logger)
+        self.frame_protected = set()
+        self.frame_stats = {'sent': 0, 'truncated': 0, 'chart_reduced': 0, 'dropped': 0, 'suppressed': 0, 'unchanged': 0, 'max_size': 0, 'last_dropped': None}
+        self.session_file = os.path.join(self.get_sh().get_basedir(), 'var', 'nspanel',
+                                         f"{self.get_fullname()}_{self.tasmota_topic}.json")
+        self.compiled_cache_file = os.path.join(self.get_sh().get_basedir(), 'var', 'nspanel', f"{self.get_fullname()}.cache")
+        self.session_restored = False
+        self.session_screensaver = False
 
         # define desired versions
         self.desired_berry_driver_version = 8
@@ -135,18 +176,52 @@ class NSPanel(MqttPlugin):
 
         # read panel config file
         try:
-            self.panel_config = self._parse_config_file()
+            self.panel_config, self.config_report = self._parse_config_file()
         except Exception as e:
             self.logger.warning(f"Exception during parsing of page config yaml file occurred: {e}")
             self._init_complete = False
             return
+        if self.panel_config is None:
+            self._init_complete = False
+            return
+        self.invalid_pages = self._get_invalid_pages(self.config_report)
+        self.frame_protected = nspanel_frame.protected_fields(self.panel_config)
+        self.value_formats.set_specs(self._get_item_formats(self.panel_config, self.config_report))
+        self.screensaver_key = self._get_screensaver_key(self.panel_config)
+        self.screensaver_paths = self._get_screensaver_paths(self.panel_config)
+        self._set_navigation(self.panel_config)
+
+        # mapping of hardware buttons
+        self.hw_buttons = {}
+        self.hw_button_state = {}
+        for button in ('button1', 'button2'):
+            mapping, report = nspanel_config.validate_button_config(button, self.get_parameter_value(button))
+            self._log_config_report(report)
+            self.config_report = self.config_report + report
+            self.hw_buttons[button] = mapping
+            self.hw_button_state[button] = {'pressed': None, 'timer': None}
+
+        # deadband, min interval and smoothing of the telemetry written to items
+        filters, report = nspanel_config.validate_telemetry_config(self.get_parameter_value('telemetry_filter'))
+        self._log_config_report(report)
+        self.config_report = self.config_report + report
+        self.telemetry_filter = nspanel_telemetry.TelemetryFilter(filters)
+        self.panel_health = nspanel_telemetry.PanelHealth(self.get_parameter_value('health_window'))
+
+        # stagger the startup of panels coming online at the same time
+        if not nspanel_engine.StartupAdmission.configure(self.get_parameter_value('startup_concurrency'),
+                                                         self.get_parameter_value('startup_jitter')):
+            self.logger.warning(f"startup_concurrency and startup_jitter are shared by all instances, "
+                                f"the values of the first instance are used: {nspanel_engine.StartupAdmission.max_concurrent} "
+                                f"and {nspanel_engine.StartupAdmission.jitter}")
+        self.startup_pending = False
 
         # link items from config to method 'update_item'
         self.get_items_of_panel_config_to_update_item()
 
         # read locale file
         try:
-            self.locale = self._parse_locale_file()
+            self.locale = self._parse_locale_file() or {}
         except Exception as e:
             self.logger.warning(f"Exception during parsing of locals yaml file occurred: {e}")
             self._init_complete = False
@@ -175,15 +250,25 @@ class NSPanel(MqttPlugin):
         self.logger.debug("Run method called")
 
         self.logger.debug("Check if items from config are available")
-        for itemname in self.panel_config_items:
-            item = self.items.return_item(itemname)
-            if item is None:
-                self.logger.error(f"{itemname} is not a valid item. Check configuration")
-                # TODO more action necessary?
+        item_report = nspanel_config.validate_config_items(self.panel_config_items_page, self.panel_config,
+                                                           self._return_item)
+        self._log_config_report(item_report)
+        self.config_report = self.config_report + item_report
+        self.invalid_pages = self._get_invalid_pages(self.config_report)
+
+        # restore panel session of last run before retained LWT is received
+        self._restore_session()
+
+        # all state changes of the panel are executed by the actor thread
+        self.actor.start()
 
         # start subscription to all topics
         self.start_subscriptions()
 
+        # watch page config file for changes
+        if self.config_reload_cycle:
+            self._add_timer('check_config_file', self._check_config_file, cycle=self.config_reload_cycle)
+
         # set plugin alive
         self.alive = True
 
@@ -199,6 +284,26 @@ class NSPanel(MqttPlugin):
 
         # remove scheduler
         self._remove_scheduler()
+        if self.config_reload_cycle:
+            self._remove_timer('check_config_file')
+
+        for button in self.hw_button_state.values():
+            if button['timer'] is not None:
+                self._remove_timer(button['timer'])
+                button['timer'] = None
+        for pending in self.pending_writes.values():
+            self._remove_timer(pending['timer'])
+        self.pending_writes = {}
+
+        self.startup_pending = False
+        nspanel_engine.StartupAdmission.release(self.get_fullname())
+
+        # finish queued commands before the session is saved
+        self.actor.stop()
+
+        self.series_cache.clear()
+
+        self._save_session()
 
     def parse_item(self, item):
         """
@@ -264,64 +369,103 @@ class NSPanel(MqttPlugin):
         :param source: if given it represents the source
         :param dest: if given it represents the dest
         """
-        if self.alive and caller != self.get_shortname():
+        if self.alive and caller == self.get_shortname():
+            # the value written by the plugin is not the one last handled, the next update must not be filtered
+            self.last_values.pop(item.property.path, None)
+
+        elif self.alive:
             # code to execute if the plugin is not stopped
             # and only, if the item has not been changed by this plugin:
-            # stop if only update and no change
-            if abs(item.property.last_change_age - item.property.last_update_age) > 0.01:
+            # stop if the value differs not from the value last handled or rendered
+            if self.last_values.get(item.property.path) == self._display_value(item.property.path, item()):
                 self.logger.debug(
                     f"update_item was called with item {item.property.path} - no change")
                 return
             self.logger.debug(
                 f"update_item was called with item {item.property.path} from caller {caller}, source {source} and dest {dest}")
+            self.actor.submit(self._handle_item_update, item)
 
-            if self.has_iattr(item.conf, 'nspanel_attr'):
-                nspanel_attr = self.get_iattr_value(item.conf, 'nspanel_attr')
-                if nspanel_attr[:5] == 'relay':
-                    value = item()
-                    # check data type
-                    if not isinstance(value, bool):
-                        return
-                    if value is not None:
-                        relay = nspanel_attr[5:]
-                        self.publish_tasmota_topic('cmnd', self.tasmota_topic, f"POWER{relay}", value, item,
-                                                   bool_values=['OFF', 'ON'])
-
-            # Update screensaver, if active
-            if self.has_iattr(item.conf, 'nspanel_update') and self.panel_status['screensaver_active']:
-                nspanel_update = self.get_iattr_value(item.conf, 'nspanel_update')
-                if nspanel_update == 'weather':
-                    self.HandleScreensaverWeatherUpdate()
-                if nspanel_update == 'status':
-                    self.HandleScreensaverIconUpdate()
-                if nspanel_update == 'time':
-                    self.send_current_time()
-
-            elif self.has_iattr(item.conf, 'nspanel_popup'):
-                nspanel_popup = self.get_iattr_value(item.conf, 'nspanel_popup')
-                if nspanel_popup[:6] == 'notify':
-                    item_value = item()
-                    if isinstance(item_value, dict):
-                        if nspanel_popup[6:] == '_screensaver':
-                            self.SendToPanel(self.GenerateScreensaverNotify(item_value))
-                        else:
-                            self.SendToPanel(self.GeneratePopupNotify(item_value))
+    def _handle_item_update(self, item):
+        """
+        Handle the change of an item, executed by the actor
+        """
+
+        # remember the value the handling is based on, it may have changed since update_item
+        self.last_values[item.property.path] = self._display_value(item.property.path, item())
+
+        # nothing is rendered or published while the panel is offline, the visible page is resynced when it is back
+        if not self.panel_status['online']:
+            self._mark_dirty(item)
+            return
+
+        # cached frames of parent pages showing the item are outdated
+        for parent in self.page_stack:
+            if item.property.path in self.panel_config_items_page.get(parent['page'], []):
+                parent['dirty'] = True
+
+        if self.has_iattr(item.conf, 'nspanel_attr'):
+            nspanel_attr = self.get_iattr_value(item.conf, 'nspanel_attr')
+            if nspanel_attr[:5] == 'relay':
+                value = item()
+                # check data type
+                if not isinstance(value, bool):
+                    return
+                if value is not None:
+                    relay = nspanel_attr[5:]
+                    self.publish_tasmota_topic('cmnd', self.tasmota_topic, f"POWER{relay}", value, item,
+                                               bool_values=['OFF', 'ON'])
+
+        # feedback of an item written by the panel, the expected value is displayed until confirmed or timed out
+        pending = self.pending_writes.get(item.property.path)
+        if pending is not None:
+            if self._display_value(item.property.path, pending['value']) == self.last_values[item.property.path]:
+                self.logger.debug(f"pending write of {item.property.path} confirmed")
+                self._remove_timer(pending['timer'])
+                del self.pending_writes[item.property.path]
+            return
+
+        # Update screensaver, if active
+        if self.has_iattr(item.conf, 'nspanel_update') and self.panel_status['screensaver_active']:
+            nspanel_update = self.get_iattr_value(item.conf, 'nspanel_update')
+            if nspanel_update == 'weather':
+                self.HandleScreensaverWeatherUpdate()
+            if nspanel_update == 'status':
+                self.HandleScreensaverIconUpdate()
+            if nspanel_update == 'time':
+                self.send_current_time()
+
+        elif self.has_iattr(item.conf, 'nspanel_popup'):
+            nspanel_popup = self.get_iattr_value(item.conf, 'nspanel_popup')
+            if nspanel_popup[:6] == 'notify':
+                item_value = item()
+                if isinstance(item_value, dict):
+                    if nspanel_popup[6:] == '_screensaver':
+                        self.SendToPanel(self.GenerateScreensaverNotify(item_value))
                     else:
-                        self.logger.warning(f"{item.id} must be a dict")
-                elif self.get_iattr_value(item.conf, 'nspanel_popup') == 'timer':
-                    entities = self.panel_config[self.current_page]['entities']
-                    entity_name = next(
-                        (entity['entity'] for entity in entities if entity.get('item', '') == item.property.path), None)
-                    if entity_name is not None:
+                        self.SendToPanel(self.GeneratePopupNotify(item_value))
+                else:
+                    self.logger.warning(f"{item.id} must be a dict")
+            elif self.get_iattr_value(item.conf, 'nspanel_popup') == 'timer':
+                entities = self.panel_config[self.current_page]['entities']
+                entity_name = next(
+                    (entity['entity'] for entity in entities if entity.get('item', '') == item.property.path), None)
+                if entity_name is not None:
+                    with self._render_context(self.current_page):
                         self.SendToPanel(self.GenerateDetailTimer(entity_name))
-            elif not self.panel_status['screensaver_active']:
-                if item.property.path in self.panel_config_items_page[self.current_page]:
-                    self.GeneratePage(self.current_page)
+        elif not self.panel_status['screensaver_active']:
+            if item.property.path in self.panel_config_items_page[self.current_page]:
+                if self.render_transaction is not None:
+                    # item written while a panel event is handled, rendered once when the handler returns
+                    self._render_current_page()
                 else:
-                    self.logger.debug(f"item not on current_page = {self.current_page}")
+                    # several items of the page changing at once result in one render
+                    self.actor.debounce('render', 0.05, self._render_current_page)
             else:
-                self.logger.debug(f"screensaver active")
-            pass
+                self.logger.debug(f"item not on current_page = {self.current_page}")
+        else:
+            # page is rendered completely when the panel wakes up
+            self._mark_dirty(item)
+            self.logger.debug(f"screensaver active")
 
     ################################
     # CallBacks
@@ -343,18 +487,173 @@ class NSPanel(MqttPlugin):
         except Exception as e:
             self.logger.error(f"received topic {topic} is not in correct format. Error was: {e}")
         else:
+            self.actor.submit(self._handle_lwt, payload)
 
-            if payload:
-                self.panel_status['online_timeout'] = datetime.now() + timedelta(seconds=self.telemetry_period + 5)
-                self.panel_status['online'] = payload
-                self._set_item_value('item_online', payload)
-                self._add_scheduler()
-                self.publish_tasmota_topic('cmnd', self.tasmota_topic, 'GetDriverVersion', 'x')
-                self.SendToPanel('pageType~pageStartup')
-                # set telemetry to get the latest STATE and SENSOR information
-                self._set_telemetry_period(self.telemetry_period)
-            else:
-                self._set_device_offline()
+    def _write_optimistic(self, entity: dict, item, value) -> None:
+        """
+        Write an item from the panel and display the expected state (also of the status item of the entity)
+        until the actuator confirms it or optimistic_timeout is reached
+        """
+
+        item(value, self.get_shortname())
+        if not self.optimistic_timeout:
+            return
+
+        expected = {item.property.path: value}
+        status = self._return_item(entity.get('item_status'))
+        if status is not None:
+            status_value = self._expected_status(entity, status, value)
+            if status_value is not None:
+                expected[status.property.path] = status_value
+
+        for path, expected_value in expected.items():
+            # a timer with the same name replaces the timer of a previous write
+            pending = {'value': expected_value, 'timer': f"optimistic_{path}"}
+            self.pending_writes[path] = pending
+            self._add_timer(pending['timer'], lambda path=path, pending=pending: self._reconcile_write(path, pending),
+                            delay=self.optimistic_timeout)
+
+    def _expected_status(self, entity: dict, status, value):
+        """
+        Return the value the status item of an entity is expected to get by writing value,
+        None if it can not be predicted from the entity type
+        """
+
+        if entity['type'] not in ['switch', 'light']:
+            return None
+        on = value == entity.get('onValue', 1)
+        if status.property.type == 'bool':
+            return on
+        if status.property.type == 'num':
+            return value
+        return None
+
+    def _reconcile_write(self, path: str, pending: dict) -> None:
+        """
+        Compare the expected value of a write with the value of the item after optimistic_timeout
+        and correct the display if they differ
+        """
+
+        if self.pending_writes.get(path) is not pending:
+            return
+        del self.pending_writes[path]
+        item = self._return_item(path)
+        if item is None:
+            return
+        value = self._display_value(path, item())
+        if value == self._display_value(path, pending['value']):
+            return
+
+        self.logger.info(f"_reconcile_write: {path} is {item()} instead of expected {pending['value']}, correcting display")
+        self.last_values[path] = value
+        if not self.panel_status['screensaver_active'] and path in self.panel_config_items_page.get(self.current_page, []):
+            self.GeneratePage(self.current_page)
+
+    def _render_current_page(self) -> None:
+        # a debounced render is combined with the renders of the updates it causes
+        with self._render_transaction():
+            if not self.panel_status['screensaver_active']:
+                self.GeneratePage(self.current_page)
+
+    def _handle_lwt(self, payload: bool) -> None:
+        """
+        Handle online state of the panel, executed by the actor
+        """
+
+        if payload and self.panel_status['online']:
+            # retained LWT is received again after a reconnect of SmartHomeNG to the broker, all panels
+            # republish at once, so they are admitted like panels starting up
+            nspanel_engine.StartupAdmission.request(self.get_fullname(), self.actor.wrap(self._republish_visible))
+        elif payload:
+            # panel is initialized when admitted, until then it is handled as offline
+            self.startup_pending = True
+            nspanel_engine.StartupAdmission.request(self.get_fullname(), self.actor.wrap(self._startup_panel))
+        else:
+            self._set_device_offline()
+
+    def _republish_visible(self) -> None:
+        """
+        Republish the cached frames of what the panel displays (page or screensaver with time and status)
+        after a reconnect to the broker. Frames rendered during the outage are lost, but already cached.
+        Executed by the actor when admitted by StartupAdmission.
+        """
+
+        if not self.panel_status['online'] or self.startup_pending:
+            # panel went offline or restarted in the meantime
+            return
+        frames = self.frame_cache.page_frames()
+        self.logger.info(f"_republish_visible: reconnected to broker, republish {len(frames)} frames of page={0 if self.panel_status['screensaver_active'] else self.current_page}")
+        if frames:
+            self.frame_cache.invalidate()
+            self.SendToPanel(frames)
+        else:
+            self.dirty_pages.add(0 if self.panel_status['screensaver_active'] else self.current_page)
+        self._resync_panel()
+        nspanel_engine.StartupAdmission.release(self.get_fullname())
+
+    def _startup_panel(self) -> None:
+        """
+        Initialize the panel after LWT Online, executed by the actor when admitted by StartupAdmission
+        """
+
+        if not self.startup_pending:
+            return
+        self.startup_pending = False
+        self._set_device_online()
+        if self.session_restored:
+            # panel was not restarted, resume the restored session instead of a new startup
+            self.session_restored = False
+            self._resume_session()
+            self._resync_panel()
+            nspanel_engine.StartupAdmission.release(self.get_fullname())
+        else:
+            self.publish_tasmota_topic('cmnd', self.tasmota_topic, 'GetDriverVersion', 'x')
+            self.frame_cache.invalidate(persistent=True)
+            self.SendToPanel('pageType~pageStartup')
+            # all pages are rendered after the startup event of the panel, which releases the admission
+            self._resync_panel(render=False)
+
+    def _mark_dirty(self, item) -> None:
+        """
+        Remember the pages (and relays) showing an item changed while they are not displayed or the panel is offline
+        """
+
+        path = item.property.path
+        for page, paths in self.panel_config_items_page.items():
+            if path in paths:
+                self.dirty_pages.add(page)
+        if self.has_iattr(item.conf, 'nspanel_update'):
+            self.dirty_pages.add(0)
+        if not self.panel_status['online'] and self.has_iattr(item.conf, 'nspanel_attr'):
+            nspanel_attr = self.get_iattr_value(item.conf, 'nspanel_attr')
+            if nspanel_attr[:5] == 'relay':
+                self.dirty_relays[nspanel_attr[5:]] = item
+
+    def _resync_panel(self, render: bool = True) -> None:
+        """
+        Bring the panel up to date after it was offline: publish the relays changed meanwhile and render
+        the visible page once, if it is dirty. All other pages are rendered when they are opened.
+        """
+
+        for relay, item in self.dirty_relays.items():
+            if isinstance(item(), bool):
+                self.publish_tasmota_topic('cmnd', self.tasmota_topic, f"POWER{relay}", item(), item,
+                                           bool_values=['OFF', 'ON'])
+        self.dirty_relays.clear()
+
+        visible = 0 if self.panel_status['screensaver_active'] else self.current_page
+        dirty = visible in self.dirty_pages
+        self.logger.debug(f"_resync_panel: dirty_pages={self.dirty_pages}, visible page={visible}, render={render and dirty}")
+        self.dirty_pages.clear()
+        if not render or not dirty:
+            return
+        if visible == 0:
+            self.send_current_time()
+            self.send_current_date()
+            self.HandleScreensaverIconUpdate()
+            self.HandleScreensaverWeatherUpdate()
+        else:
+            self.GeneratePage(visible)
 
     def on_mqtt_message(self, topic: str, payload: dict, qos: int = None, retain: bool = None) -> None:
         """
@@ -375,51 +674,77 @@ class NSPanel(MqttPlugin):
         except Exception as e:
             self.logger.error(f"received topic {topic} is not in correct format. Error was: {e}")
         else:
+            self.actor.submit(self._handle_message, info_topic, payload)
 
-            # handle message
-            if isinstance(payload, dict) and info_topic in ['STATE', 'RESULT']:
+    def _handle_message(self, info_topic: str, payload: dict) -> None:
+        """
+        Handle STATE, RESULT and SENSOR messages of the panel, executed by the actor
+        """
 
-                # Handling of Driver Version
-                if 'nlui_driver_version' in payload:
-                    self.logger.info(f"Received Message decoded as driver version message.")
-                    self.berry_driver_version = payload['nlui_driver_version']
+        # panel was set offline by the online timeout, but is still there
+        resync = not self.panel_status['online'] and not self.startup_pending
+        if resync:
+            self.logger.info(f"Received Message from {self.tasmota_topic} while offline, panel is online again")
+            self._set_device_online()
+
+        # handle message
+        if isinstance(payload, dict) and info_topic in ['STATE', 'RESULT']:
+
+            # Handling of Driver Version
+            if 'nlui_driver_version' in payload:
+                self.logger.info(f"Received Message decoded as driver version message.")
+                self.berry_driver_version = payload['nlui_driver_version']
+                if self.version_check_pending:
+                    self.version_check_pending = False
+                    if self.firmware_check == 'notify':
+                        self._check_versions()
+
+            # Handling of TelePeriod
+            if 'TelePeriod' in payload:
+                self.logger.info(f"Received Message decoded as teleperiod message.")
+                self._handle_teleperiod(payload['TelePeriod'])
+
+            # Handling of CustomRecv messages
+            elif 'CustomRecv' in payload:
+                self.logger.info(
+                    f"Received Message decoded as NSPanel Message, will be put to queue for logging reasons. {self.custom_msg_queue.qsize() + 1} messages logged.")
+                self.custom_msg_queue.put(payload['CustomRecv'])
+                with self._render_transaction():
+                    self.HandlePanelMessage(payload['CustomRecv'])
 
-                # Handling of TelePeriod
-                if 'TelePeriod' in payload:
-                    self.logger.info(f"Received Message decoded as teleperiod message.")
-                    self._handle_teleperiod(payload['TelePeriod'])
+            # Handling of Power messages
+            elif any(item.startswith("POWER") for item in payload.keys()):
+                self.logger.info(f"Received Message decoded as power message.")
+                self._handle_power(payload)
 
-                # Handling of CustomRecv messages
-                elif 'CustomRecv' in payload:
-                    self.logger.info(
-                        f"Received Message decoded as NSPanel Message, will be put to queue for logging reasons. {self.custom_msg_queue.qsize() + 1} messages logged.")
-                    self.custom_msg_queue.put(payload['CustomRecv'])
-                    self.HandlePanelMessage(payload['CustomRecv'])
+            # Handling of health metrics
+            if info_topic == 'STATE':
+                self._handle_health(payload)
 
-                # Handling of Power messages
-                elif any(item.startswith("POWER") for item in payload.keys()):
-                    self.logger.info(f"Received Message decoded as power message.")
-                    self._handle_power(payload)
+            # Handling of Wi-Fi
+            if 'Wifi' in payload:
+                self.logger.info(f"Received Message contains Wifi information.")
+                self._handle_wifi(payload['Wifi'])
 
-                # Handling of Wi-Fi
-                if 'Wifi' in payload:
-                    self.logger.info(f"Received Message contains Wifi information.")
-                    self._handle_wifi(payload['Wifi'])
+            # Handling of Uptime
+            if 'Uptime' in payload:
+                self.logger.info(f"Received Message contains Uptime information.")
+                self._handle_uptime(payload['Uptime'])
+            if 'UptimeSec' in payload:
+                self._handle_uptime_sec(payload['UptimeSec'])
 
-                # Handling of Uptime
-                if 'Uptime' in payload:
-                    self.logger.info(f"Received Message contains Uptime information.")
-                    self._handle_uptime(payload['Uptime'])
+        elif isinstance(payload, dict) and info_topic == 'SENSOR':
+            self.logger.info(f"Received Message contains sensor information.")
+            self._handle_sensor(payload)
 
-            elif isinstance(payload, dict) and info_topic == 'SENSOR':
-                self.logger.info(f"Received Message contains sensor information.")
-                self._handle_sensor(payload)
+        else:
+            self.logger.warning(f"Received Message '{payload}' not handled within plugin.")
 
-            else:
-                self.logger.warning(f"Received Message '{payload}' not handled within plugin.")
+        # setting new online-timeout
+        self.panel_status['online_timeout'] = datetime.now() + timedelta(seconds=self.telemetry_period + 5)
 
-            # setting new online-timeout
-            self.panel_status['online_timeout'] = datetime.now() + timedelta(seconds=self.telemetry_period + 5)
+        if resync:
+            self._resync_panel()
 
     def on_mqtt_power_message(self, topic: str, payload: dict, qos: int = None, retain: bool = None) -> None:
         """
@@ -438,11 +763,18 @@ class NSPanel(MqttPlugin):
             self.logger.error(f"received topic {topic} is not in correct format. Error was: {e}")
         else:
             if info_topic.startswith('POWER'):
-                tasmota_relay = str(info_topic[5:])
-                tasmota_relay = '1' if not tasmota_relay else None
-                item_relay = f'item_relay{tasmota_relay}'
-                self._set_item_value(item_relay, payload == 'ON')
-                self.panel_status['relay'][info_topic] = payload
+                self.actor.submit(self._handle_power_topic, info_topic, payload)
+
+    def _handle_power_topic(self, info_topic: str, payload) -> None:
+        """
+        Handle POWER messages of the panel, executed by the actor
+        """
+
+        tasmota_relay = str(info_topic[5:])
+        tasmota_relay = '1' if not tasmota_relay else None
+        item_relay = f'item_relay{tasmota_relay}'
+        self._set_item_value(item_relay, payload == 'ON')
+        self.panel_status['relay'][info_topic] = payload
 
     ################################
     # MQTT Stuff
@@ -513,7 +845,17 @@ class NSPanel(MqttPlugin):
             self.logger.debug(
                 f"{self.tasmota_topic}: No item for itemtype '{itemtype}' defined to set to '{value}'.")
 
+    def _set_device_online(self):
+        self.panel_status['online_timeout'] = datetime.now() + timedelta(seconds=self.telemetry_period + 5)
+        self.panel_status['online'] = True
+        self._set_item_value('item_online', True)
+        self._add_scheduler()
+        # set telemetry to get the latest STATE and SENSOR information
+        self._set_telemetry_period(self.telemetry_period)
+
     def _set_device_offline(self):
+        self.startup_pending = False
+        nspanel_engine.StartupAdmission.release(self.get_fullname())
         self._set_item_value('item_online', False)
         self.logger.info(
             f"{self.tasmota_topic} is not online any more - online_timeout={self.panel_status['online_timeout']}, now={datetime.now()}")
@@ -523,9 +865,12 @@ class NSPanel(MqttPlugin):
         self.panel_status['online'] = False
         self.panel_status['screensaver_active'] = False
         self.panel_status['uptime'] = '-'
+        self.panel_status.pop('uptime_sec', None)
         self.panel_status['wifi_signal'] = 0
         self.panel_status['sensors'].clear()
         self.panel_status['relay'].clear()
+        # state of the display is unknown, when it is back
+        self.frame_cache.invalidate(persistent=True)
 
         self._remove_scheduler()
 
@@ -560,7 +905,19 @@ class NSPanel(MqttPlugin):
             if isinstance(wifi_signal, str) and wifi_signal.isdigit():
                 wifi_signal = int(wifi_signal)
             self.panel_status['wifi_signal'] = wifi_signal
-            self._set_item_value('item_wifi_signal', wifi_signal)
+            self._set_telemetry_items({'wifi_signal': wifi_signal})
+
+    def _handle_health(self, payload: dict) -> None:
+        """
+        Capture the health metrics of a STATE telegram and update the health items
+        :param payload:         MQTT message payload
+        """
+        values = self.panel_health.update(payload)
+        self.logger.debug(f"_handle_health: captured {values}")
+        for metric, value in values.items():
+            self._set_item_value(f'item_health_{metric}', value)
+        if values:
+            self._set_item_value('item_health', self.panel_health.rollups())
 
     def _handle_teleperiod(self, teleperiod: dict) -> None:
 
@@ -573,6 +930,18 @@ class NSPanel(MqttPlugin):
         self.panel_status['uptime'] = uptime
         self._set_item_value('item_uptime', uptime)
 
+    def _handle_uptime_sec(self, uptime_sec: int) -> None:
+        """
+        Detect a restart of the panel not noticed by LWT, e.g. during a broker outage, and start it up again
+        """
+        last_uptime_sec = self.panel_status.get('uptime_sec')
+        self.panel_status['uptime_sec'] = uptime_sec
+        if last_uptime_sec is None or uptime_sec >= last_uptime_sec or not self.panel_status['online']:
+            return
+        self.logger.info(f"_handle_uptime_sec: panel was restarted (uptime {last_uptime_sec}s -> {uptime_sec}s), starting up again")
+        self.startup_pending = True
+        nspanel_engine.StartupAdmission.request(self.get_fullname(), self.actor.wrap(self._startup_panel))
+
     def _handle_power(self, payload: dict) -> None:
         """
         Extracts Power information out of payload and updates plugin dict
@@ -595,6 +964,7 @@ class NSPanel(MqttPlugin):
 
         # tele / NSPanel1 / SENSOR = {"Time": "2022-12-03T13:21:26", "ANALOG": {"Temperature1": 28.0}, "ESP32": {"Temperature": 38.9}, "TempUnit": "C"}
 
+        values = {}
         for sensor in self.TEMP_SENSOR:
             data = payload.get(sensor)
 
@@ -606,7 +976,21 @@ class NSPanel(MqttPlugin):
                 for key in self.TEMP_SENSOR_KEYS:
                     if key in data:
                         self.panel_status['sensors'][sensor][key.lower()] = data[key]
-                        self._set_item_value(self.TEMP_SENSOR_KEYS[key], data[key])
+                        values[self.TEMP_SENSOR_KEYS[key][5:]] = data[key]
+
+        self._set_telemetry_items(values)
+
+    def _set_telemetry_items(self, values: dict) -> None:
+        """
+        Write the significant telemetry values of a telegram to their items
+        :param values:          dict of nspanel_attr to raw value
+        """
+
+        significant = self.telemetry_filter.update(values)
+        if len(significant) < len(values):
+            self.logger.debug(f"_set_telemetry_items: {sorted(set(values) - set(significant))} not changed significantly")
+        for key, value in significant.items():
+            self._set_item_value(f'item_{key}', value)
 
     ################################
     #  NSPage Stuff
@@ -619,13 +1003,12 @@ class NSPanel(MqttPlugin):
 
         self.logger.debug('Add scheduler for cyclic updates of time and date')
 
-        dt = self.shtime.now() + timedelta(seconds=20)
-        self.scheduler_add('update_time', self.send_current_time, next=dt, cycle=60)
-        self.scheduler_add('update_date', self.send_current_date, cron='1 0 0 * * *', next=dt)
+        self._add_timer('update_time', self.send_current_time, delay=20, cycle=60)
+        self._add_timer('update_date', self.send_current_date, delay=20, cron='1 0 0 * * *')
 
         self.logger.debug(f"Add scheduler for online_status")
-        dt = self.shtime.now() + timedelta(seconds=(self.telemetry_period - 3))
-        self.scheduler_add('check_online_status', self._check_online_status, cycle=self.telemetry_period, next=dt)
+        self._add_timer('check_online_status', self._check_online_status, delay=self.telemetry_period - 3,
+                        cycle=self.telemetry_period)
 
     def _remove_scheduler(self):
         """
@@ -634,122 +1017,483 @@ class NSPanel(MqttPlugin):
 
         self.logger.debug('Remove scheduler for cyclic updates of time and date')
 
-        self.scheduler_remove('update_time')
-        self.scheduler_remove('update_date')
+        self._remove_timer('update_time')
+        self._remove_timer('update_date')
 
         self.logger.debug('Remove scheduler for online status')
-        self.scheduler_remove('check_online_status')
+        self._remove_timer('check_online_status')
+
+    def _add_timer(self, name: str, func, delay: float = None, cycle: int = None, cron: str = None) -> None:
+        """
+        Add a timer submitting func to the engine, either as scheduler entry or as timer of the asyncio engine.
+        The asyncio engine only supports the daily cron '1 0 0 * * *'.
+        """
+
+        if not self.actor.has_timers:
+            dt = self.shtime.now() + timedelta(seconds=delay) if delay is not None else None
+            self.scheduler_add(name, self.actor.wrap(func), cycle=cycle, cron=cron, next=dt)
+        elif cron is not None:
+            self.actor.add_timer(name, func, delay or 0, next_delay=self._seconds_to_next_day)
+        else:
+            self.actor.add_timer(name, func, cycle if delay is None else delay, cycle=cycle)
+
+    def _remove_timer(self, name: str) -> None:
+        if self.actor.has_timers:
+            self.actor.remove_timer(name)
+        else:
+            self.scheduler_remove(name)
+
+    def _seconds_to_next_day(self) -> float:
+        now = self.shtime.now()
+        next_day = (now + timedelta(days=1)).replace(hour=0, minute=0, second=1, microsecond=0)
+        return (next_day - now).total_seconds()
+
+    def _save_session(self) -> None:
+        """
+        Save the panel session (navigation, last sent frames and firmware info) for a warm restart
+        """
+
+        session = {'version': self.PLUGIN_VERSION,
+                   'saved': time.time(),
+                   'config_file_mtime': self.config_file_mtime,
+                   'online': self.panel_status['online'],
+                   'current_page': self.current_page,
+                   'screensaver_active': self.panel_status['screensaver_active'],
+                   'last_frames': self.frame_cache.frames,
+                   'page_stack': self.page_stack,
+                   'berry_driver_version': self.berry_driver_version,
+                   'display_firmware_version': self.display_firmware_version,
+                   'panel_model': self.panel_model,
+                   }
+        try:
+            os.makedirs(os.path.dirname(self.session_file), exist_ok=True)
+            with open(self.session_file, 'w') as stream:
+                json.dump(session, stream)
+        except Exception as e:
+            self.logger.warning(f"_save_session: Saving panel session to {self.session_file} failed: {e}")
+        else:
+            self.logger.debug(f"_save_session: panel session saved to {self.session_file}")
+
+    def _restore_session(self) -> None:
+        """
+        Restore the panel session saved at last stop, if it still matches the page config
+        """
+
+        try:
+            with open(self.session_file, 'r') as stream:
+                session = json.load(stream)
+            os.remove(self.session_file)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            self.logger.warning(f"_restore_session: Reading panel session from {self.session_file} failed: {e}")
+            return
+
+        if session.get('version') != self.PLUGIN_VERSION or not session.get('online') or not session.get('panel_model'):
+            self.logger.info("_restore_session: saved panel session is not usable")
+            return
+
+        self.berry_driver_version = session['berry_driver_version']
+        self.display_firmware_version = session['display_firmware_version']
+        self.panel_model = session['panel_model']
+
+        # navigation and frames are only valid for an unchanged page config
+        if session['config_file_mtime'] == self.config_file_mtime and session['current_page'] < len(self.panel_config):
+            self.current_page = session['current_page']
+            self.panel_status['screensaver_active'] = session['screensaver_active']
+            self.frame_cache.frames = dict(session.get('last_frames', {}))
+            self.page_stack = session.get('page_stack', [])
+            # panel switched to screensaver on its own if the timeout passed during restart (timeout 0 = never)
+            timeout = self.panel_config[0]['timeout']
+            if timeout and time.time() - session['saved'] > timeout:
+                self.session_screensaver = True
+        else:
+            self.session_screensaver = True
+
+        self.session_restored = True
+        self.logger.info(f"_restore_session: panel session restored, current_page={self.current_page}, screensaver_active={self.panel_status['screensaver_active']}")
+
+    def _resume_session(self) -> None:
+        """
+        Refresh the page shown by the panel after a warm restart. Unchanged frames are suppressed by SendToPanel.
+        """
+
+        self.logger.info(f"_resume_session: resume panel session at page={self.current_page}")
+        if self.session_screensaver:
+            # page of the session is outdated, the screensaver is sent completely
+            self.session_screensaver = False
+            self.HandleScreensaver()
+        elif self.panel_status['screensaver_active']:
+            self.send_current_time()
+            self.send_current_date()
+            self.HandleScreensaverIconUpdate()
+            self.HandleScreensaverWeatherUpdate()
+        else:
+            self.GeneratePage(self.current_page)
 
     def _parse_config_file(self):
         """
         Parse the page config file and check for completeness
+        :return:    tuple of (config, validation report), config is None if it is not usable
         """
 
-        with open(self.config_file_location, 'r') as stream:
+        self.config_file_mtime = os.path.getmtime(self.config_file_location)
+        data, digest = nspanel_config.read_yaml_source(self.config_file_location)
+        key = (digest, self.PLUGIN_VERSION, nspanel_config.compiled_version(), self.desired_panel_model)
+        compiled = nspanel_config.load_compiled(self.compiled_cache_file, 'config', key)
+        if compiled is not None:
+            self.logger.debug(f"_parse_config_file: compiled page config loaded from {self.compiled_cache_file}")
+            config, report = compiled
+        else:
             try:
-                config = yaml.safe_load(stream)
+                config = nspanel_config.parse_yaml(data)
             except yaml.YAMLError as exc:
                 self.logger.warning(f"Exception during parsing of page config yaml file occurred: {exc}")
-                return None
+                return None, []
+            config, report = nspanel_config.validate_panel_config(config, self.desired_panel_model)
+            self._save_compiled('config', key, (config, report))
 
-        # ToDo: Für alle Pages die Anzahl der Entities prüfen
-        # ToDo: Für alle Pages die Konfig auf Vollständigkeit prüfen
+        self._log_config_report(report)
+        if any(entry['level'] == 'error' and entry['page'] is None for entry in report):
+            return None, report
 
         self.logger.debug(f"_parse_config_file: page-config={config} available!")
-        return config
+        return config, report
+
+    def _save_compiled(self, section: str, key, data) -> None:
+        """
+        Store compiled config data, so the yaml file needs not to be parsed and validated at the next start
+        """
+
+        try:
+            nspanel_config.save_compiled(self.compiled_cache_file, section, key, data)
+        except Exception as e:
+            self.logger.info(f"_save_compiled: compiled {section} could not be stored in {self.compiled_cache_file}: {e}")
+
+    def _log_config_report(self, report: list) -> None:
+        """
+        Log the entries of a config validation report
+        """
+
+        for entry in report:
+            msg = f"Page config: page={entry['page']}, entity={entry['entity']}: {entry['message']}"
+            if entry['level'] == 'error':
+                self.logger.error(msg)
+            else:
+                self.logger.warning(msg)
+
+    @staticmethod
+    def _get_invalid_pages(report: list) -> set:
+        return {entry['page'] for entry in report if entry['level'] == 'error'}
 
     def _parse_locale_file(self):
         """
-        Parse the locals file and check for completeness
+        Parse the locals file and compile a flat table {(group, entry): text} for the configured language
         """
-        with open(os.path.join(sys.path[0], "plugins", self.get_shortname(), "locale.yaml"), "r") as stream:
+        data, digest = nspanel_config.read_yaml_source(os.path.join(sys.path[0], "plugins", self.get_shortname(), "locale.yaml"))
+        key = (digest, self.PLUGIN_VERSION, nspanel_config.compiled_version(), self.language)
+        locale_table = nspanel_config.load_compiled(self.compiled_cache_file, 'locale', key)
+        if locale_table is None:
             try:
-                locale_dict = yaml.safe_load(stream)
+                locale_dict = nspanel_config.parse_yaml(data)
             except yaml.YAMLError as exc:
                 self.logger.warning(f"Exception during parsing of locale yaml file occurred: {exc}")
                 return None
+            locale_table = self._compile_locale(locale_dict, self.language)
+            self._save_compiled('locale', key, locale_table)
 
-        self.logger.debug(f"_parse_locale_file: locale={locale_dict} available!")
-        return locale_dict
+        self.logger.debug(f"_parse_locale_file: locale={locale_table} for language={self.language} available!")
+        return locale_table
+
+    def _compile_locale(self, locale_dict: dict, language: str) -> dict:
+        """
+        Flatten the translations of the locale file to the given language.
+        Fallback: other region of same language (e.g. de-AT -> de-DE), then en-US, then first translation
+        """
+
+        prefix = language.split('-')[0].lower()
+        locale_table = {}
+        for group, entries in locale_dict.items():
+            # translations for the web interface are handled by SmartHomeNG
+            if group == 'plugin_translations' or not isinstance(entries, dict):
+                continue
+            for entry, translations in entries.items():
+                if not isinstance(translations, dict) or not translations:
+                    continue
+                text = translations.get(language)
+                if text is None:
+                    text = next((value for key, value in translations.items() if key.lower().startswith(f"{prefix}-")), None)
+                if text is None:
+                    text = translations.get('en-US', next(iter(translations.values())))
+                locale_table[(group, entry)] = text
+        return locale_table
 
     def get_items_of_panel_config_to_update_item(self):
         """
         Put all item out of config file to update_item
         """
 
-        for idx, card in enumerate(self.panel_config):
-            self.panel_config_items_page[idx] = []
-            temp = []
+        self.panel_config_items, self.panel_config_items_page = self._get_items_of_panel_config(self.panel_config)
+
+    def _get_items_of_panel_config(self, panel_config) -> tuple:
+        """
+        Collect all items of the given page config
+        :return:    tuple of (dict of all items as ordered set, dict of item lists per page)
+        """
+
+        # dict as ordered set for fast membership checks
+        panel_config_items = {}
+        panel_config_items_page = {}
+        for idx, card in enumerate(panel_config):
+            temp = {}
+            panel_config_items_page[idx] = []
+            if not isinstance(card, dict):
+                # reported by validate_panel_config
+                continue
             entities = card.get('entities')
-            if entities is not None:
+            if isinstance(entities, list):
                 for entity in entities:
-                    item = entity.get('item', None)
-                    # Add all possible items without check, parse_item is only called for valid items
-                    if item is not None and item != '' and item not in temp:
-                        temp.append(item)
-                        if item not in self.panel_config_items:
-                            self.panel_config_items.append(item)
+                    if not isinstance(entity, dict):
+                        continue
+                    for element in entity:
+                        if element[:4] != 'item':
+                            continue
+                        item = entity[element]
+                        # Add all possible items without check, parse_item is only called for valid items
+                        if isinstance(item, str) and item != '':
+                            temp[item] = None
+                            panel_config_items[item] = None
 
             for element in card:
                 if element[:4] == 'item':
-                    item = card.get(element, None)
-                    if item is not None and item != '' and item not in temp:
-                        temp.append(item)
-                        if item not in self.panel_config_items:
-                            self.panel_config_items.append(item)
+                    items = card.get(element, None)
+                    # chart pages may contain a list of items
+                    if not isinstance(items, list):
+                        items = [items]
+                    for item in items:
+                        if item is not None and item != '':
+                            temp[item] = None
+                            panel_config_items[item] = None
+
+            panel_config_items_page[idx] = list(temp)
+
+        return panel_config_items, panel_config_items_page
+
+    def _check_config_file(self):
+        """
+        Check if the page config file has been changed and reload it without restart
+        """
+
+        try:
+            mtime = os.path.getmtime(self.config_file_location)
+        except OSError as e:
+            self.logger.warning(f"_check_config_file: page config file not accessible: {e}")
+            return
 
-            self.panel_config_items_page[idx] = temp
+        if mtime == self.config_file_mtime:
+            return
+
+        self.logger.info(f"_check_config_file: page config file {self.config_file_location} changed, reloading")
+        try:
+            new_config, report = self._parse_config_file()
+        except Exception as e:
+            self.logger.warning(f"Exception during parsing of page config yaml file occurred: {e}")
+            return
+        if new_config is None:
+            self.logger.warning("_check_config_file: page config is invalid, keep current config")
+            return
+
+        self._apply_panel_config(new_config, report)
+
+    def _apply_panel_config(self, new_config, report: list):
+        """
+        Swap in a new page config, link new items to update_item and refresh the panel if the
+        current page changed
+        """
+
+        new_items, new_items_page = self._get_items_of_panel_config(new_config)
+        # items may have been added to SmartHomeNG since the last lookup
+        self.item_index.clear()
+        item_report = nspanel_config.validate_config_items(new_items_page, new_config, self._return_item)
+        self._log_config_report(item_report)
+        report = report + item_report
+        old_config = self.panel_config
+        changed_pages = {idx for idx, card in enumerate(new_config)
+                         if idx >= len(old_config) or old_config[idx] != card}
+        self.logger.debug(f"_apply_panel_config: changed pages={sorted(changed_pages)}")
+
+        # build all state of the new config before swapping, so a failure keeps the current config
+        invalid_pages = self._get_invalid_pages(report)
+        frame_protected = nspanel_frame.protected_fields(new_config)
+        formats = self._get_item_formats(new_config, report)
+        screensaver_key = self._get_screensaver_key(new_config)
+        screensaver_paths = self._get_screensaver_paths(new_config)
+        navigation = nspanel_config.build_navigation(new_config)
+
+        # items not known at parse_item need to be linked to update_item
+        for itemname in new_items:
+            if itemname not in self.panel_config_items:
+                item = self._return_item(itemname)
+                if item is not None and self.update_item not in item.get_method_triggers():
+                    item.add_method_trigger(self.update_item)
+
+        # swap config and item index together
+        self.panel_config, self.panel_config_items, self.panel_config_items_page = new_config, new_items, new_items_page
+        self.config_report, self.invalid_pages = report, invalid_pages
+        self.frame_protected = frame_protected
+        self.value_formats.set_specs(formats)
+        self.screensaver_key, self.screensaver_paths = screensaver_key, screensaver_paths
+        self.page_index, self.main_pages, self.main_position = navigation
+        # cached parent frames are outdated
+        self.page_stack = []
+        if self.current_page >= len(new_config):
+            self.current_page = self._home_page()
+
+        if not self.alive or not self.panel_status['online']:
+            return
+        if self.panel_status['screensaver_active']:
+            if 0 in changed_pages:
+                self.HandleScreensaver()
+        elif self.current_page in changed_pages:
+            self.GeneratePage(self.current_page)
+
+    def _get_screensaver_key(self, panel_config) -> str:
+        """
+        Fingerprint of everything the screensaver frames are built of besides item values.
+        Panels with the same fingerprint share their screensaver frames.
+        """
+        settings = [panel_config[0], self.language, self.defaultColor, self.defaultBackgroundColor,
+                    self.defaultOnColor, self.defaultOffColor]
+        return hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _get_screensaver_paths(self, panel_config) -> list:
+        """
+        Values of the screensaver config which may be items instead of fixed values (status icons and
+        weather). They are not items of page 0, so they are added to the key of the shared screensaver frames.
+        """
+        screensaver = panel_config[0]
+        if not isinstance(screensaver, dict):
+            return []
+        values = [screensaver.get('statusIconLeft'), screensaver.get('statusIconRight')]
+        entities = screensaver.get('entities')
+        for entity in entities if isinstance(entities, list) else []:
+            if isinstance(entity, dict):
+                values.extend(entity.get(key) for key in ('heading', 'icon', 'iconColor', 'text'))
+        return list(dict.fromkeys(value for value in values if isinstance(value, str) and value != ''))
+
+    def _get_screensaver_values(self) -> str:
+        """
+        Return the values of the items read by the screensaver besides the items of page 0
+        """
+        values = []
+        for path in self.screensaver_paths:
+            item = self._return_item(path)
+            if item is not None:
+                values.append((path, self._item_value(item)))
+        return repr(values)
+
+    def _set_navigation(self, panel_config):
+        """
+        Precompute page index and order of main pages (pages not being a subPage)
+        """
+
+        self.page_index, self.main_pages, self.main_position = nspanel_config.build_navigation(panel_config)
+
+    def _home_page(self) -> int:
+        return self.main_pages[0] if self.main_pages else 1
 
     def _next_page(self):
         """
-        return next_page number
+        set current_page to next main page
         """
 
-        self.current_page += 1
-        if self.current_page >= len(self.panel_config):
-            self.current_page -= len(self.panel_config)
+        self.page_stack = []
+        pos = self.main_position.get(self.current_page)
+        if pos is None or not self.main_pages:
+            self.current_page = self._home_page()
+        else:
+            self.current_page = self.main_pages[(pos + 1) % len(self.main_pages)]
         self.logger.debug(f"next_page={self.current_page}")
 
     def _previous_page(self):
         """
-        return previous_page number
+        set current_page to previous main page
         """
 
-        self.current_page -= 1
-        if self.current_page < 1:
-            self.current_page += len(self.panel_config)
+        self.page_stack = []
+        pos = self.main_position.get(self.current_page)
+        if pos is None or not self.main_pages:
+            self.current_page = self._home_page()
+        else:
+            self.current_page = self.main_pages[(pos - 1) % len(self.main_pages)]
         self.logger.debug(f"previous_page={self.current_page}")
 
+    def _goto_page(self, page: int):
+        """
+        Jump to a page, leaving all subpages
+        """
+
+        self.page_stack = []
+        self.current_page = page
+        self.GeneratePage(page)
+
+    def _navigate_to(self, page: int):
+        """
+        Open a child page. The frames of the current page are kept, so going up again only republishes them.
+        """
+
+        self.page_stack.append({'page': self.current_page, 'frames': self.frame_cache.page_frames(), 'dirty': False})
+        self.current_page = page
+        self.GeneratePage(page)
+
+    def _navigate_up(self):
+        """
+        Return to the parent page, republish its frames if none of its items changed in the meantime
+        """
+
+        if not self.page_stack:
+            self._goto_page(self._home_page())
+            return
+        parent = self.page_stack.pop()
+        self.current_page = parent['page']
+        if parent['dirty'] or not parent['frames'] or parent['page'] in self.invalid_pages:
+            self.GeneratePage(self.current_page)
+        else:
+            self.logger.debug(f"_navigate_up: republish cached frames of page={self.current_page}")
+            self.panel_status['screensaver_active'] = False
+            self._set_item_value('item_screensaver_active', False)
+            self.frame_cache.invalidate()
+            self.SendToPanel(parent['frames'])
+
     def _get_locale(self, group, entry):
-        return self.locale.get(group, {}).get(entry, {}).get('de-DE')  # TODO configure in plugin.yaml
+        return self.locale.get((group, entry), entry)
 
     def send_current_time(self):
-        secondLineItem = self.panel_config[0].get('itemSecondLine', '')
-        secondLine = self.items.return_item(secondLineItem)()
+        secondLine = self.getItemValue(self.panel_config[0]['itemSecondLine'])
         if secondLine is None:
             secondLine = ''
-        timeFormat = self.panel_config[0].get('timeFormat', "%H:%M")
-        self.publish_tasmota_topic(payload=f"time~{self.shtime.now().strftime(timeFormat)}~{secondLine}")
+        timeFormat = self.panel_config[0]['timeFormat']
+        self.SendToPanel(f"time~{self.shtime.now().strftime(timeFormat)}~{secondLine}")
 
     def send_current_date(self):
-        dateFormat = self.panel_config[0].get('dateFormat', "%A, %-d. %B %Y")
+        dateFormat = self.panel_config[0]['dateFormat']
         # replace some variables to get localized strings
         dateFormat = dateFormat.replace('%A',
                                         self.shtime.weekday_name())  # TODO add code after merge in main repository .replace('%B', self.shtime.current_monthname())
-        self.publish_tasmota_topic(payload=f"date~{self.shtime.now().strftime(dateFormat)}")
+        self.SendToPanel(f"date~{self.shtime.now().strftime(dateFormat)}")
 
     def send_screensavertimeout(self):
-        screensavertimeout = self.panel_config[0].get('timeout', 10)
-        self.publish_tasmota_topic(payload=f"timeout~{screensavertimeout}")
+        screensavertimeout = self.panel_config[0]['timeout']
+        self.SendToPanel(f"timeout~{screensavertimeout}")
 
     def send_panel_brightness(self):
-        brightness_screensaver = self.panel_config[0].get('brightness', 10)
+        brightness_screensaver = self.panel_config[0]['brightness']
         brightness_active = self.brightness
         dbc = Colors.GetColor(self.defaultBackgroundColor)
         # same value for both values will break sleep timer of the firmware # comment from HA code
         if brightness_screensaver == brightness_active:
             brightness_screensaver = brightness_screensaver - 1
-        self.publish_tasmota_topic(payload=f"dimmode~{brightness_screensaver}~{brightness_active}~{dbc}")
+        self.SendToPanel(f"dimmode~{brightness_screensaver}~{brightness_active}~{dbc}")
 
     def HandlePanelMessage(self, payload: str) -> None:
         """
@@ -794,99 +1538,44 @@ class NSPanel(MqttPlugin):
         event,buttonPress2,item,actionName,code
         """
 
-        try:
-            content_list = payload.split(',')
-        except Exception as e:
-            self.logger.warning(f"During handling of payload exception occurred: {e}")
-            return None
-
-        self.logger.debug(
-            f"HandlePanelMessage: content_list={content_list}, length of content_list={len(content_list)}")
+        event = nspanel_event.parse_event(payload)
+        if event is None:
+            self.logger.warning(f"HandlePanelMessage: malformed or unknown message '{payload}' ignored")
+            return
 
-        typ = content_list[0]
-        method = content_list[1]
-        words = content_list
+        self.logger.debug(f"HandlePanelMessage: {event}")
 
-        if typ == 'event':
+        method = event.method
+        if event.type == 'event':
             if method == 'startup':
-                self.display_firmware_version = words[2]
-                self.panel_model = words[3]
+                if self.startup_pending:
+                    # panel started before it was admitted, the startup event admits it. The startup page is
+                    # not sent again and the versions are checked when the driver version is received
+                    self.startup_pending = False
+                    self.session_restored = False
+                    self._set_device_online()
+                    self.berry_driver_version = 0
+                    self.publish_tasmota_topic('cmnd', self.tasmota_topic, 'GetDriverVersion', 'x')
+                self.display_firmware_version = event.value
+                self.panel_model = event.page
+                # display restarted, all frames have to be sent again
+                self.frame_cache.invalidate(persistent=True)
                 self.send_screensavertimeout()
                 self.send_panel_brightness()
 
-                if self.firmware_check == 'notify':
-                    # Check driver version
-                    if int(self.berry_driver_version) < self.desired_berry_driver_version:
-                        self.logger.warning(
-                            f"Update of Tasmota Driver needed! installed: {self.berry_driver_version} required: {self.desired_berry_driver_version}")
-                        if self.display_driver_update:
-                            update_message = {
-                                "entity": "driverUpdate",
-                                "heading": "Driver Update available!",
-                                "text": ("There's an update available for the Tasmota\r\n"
-                                         "Berry driver, do you want to start the update\r\n"
-                                         "now?\r\n"
-                                         "If you encounter issues after the update or\r\n"
-                                         "this message appears frequently, please check\r\n"
-                                         "the manual and repeat the installation steps\r\n"
-                                         "for the Tasmota Berry driver."
-                                         ),
-                                "buttonLeft": "Dismiss",
-                                "buttonRight": "Update",
-                                "timeout": 0,
-                            }
-                            self.SendToPanel(self.GeneratePopupNotify(update_message))
-                        self.display_driver_update = False
-
-                    # Check panel model
-                    elif self.panel_model != self.desired_panel_model:
-                        self.logger.warning(
-                            f"Update of Display Firmware needed! installed: {self.panel_model} configured: {self.desired_panel_model}")
-                        if self.display_display_update:
-                            update_message = {
-                                "entity": "displayUpdate",
-                                "heading": "Display Update available!",
-                                "text": ("The configured model does not match to the\r\n"
-                                         "installed firmware. Possible solutions:\r\n"
-                                         f"- Set model to '{self.panel_model}' in configuration\r\n"
-                                         "- Update the correct display firmware\r\n"
-                                         "If the update fails check the installation manu-\r\n"
-                                         "al and flash again over the Tasmota console\r\n"
-                                         "Be patient, the update will take a while.\r\n"
-                                         ),
-                                "buttonLeft": "Dismiss",
-                                "buttonRight": "Update",
-                                "timeout": 0,
-                            }
-                            self.SendToPanel(self.GeneratePopupNotify(update_message))
-
-                    # Check display firmware version
-                    elif int(self.display_firmware_version) < self.desired_display_firmware_version:
-                        self.logger.warning(
-                            f"Update of Display Firmware needed! installed: {self.display_firmware_version} required: {self.desired_display_firmware_version}")
-                        if self.display_display_update:
-                            update_message = {
-                                "entity": "displayUpdate",
-                                "heading": "Display Update available!",
-                                "text": ("There's a firmware update available for the\r\n"
-                                         "Nextion screen of the NSPanel. Do you want to\r\n"
-                                         "start the update now?\r\n"
-                                         "If the update fails check the installation manu-\r\n"
-                                         "al and flash again over the Tasmota console\r\n"
-                                         "Be patient, the update will take a while."
-                                         ),
-                                "buttonLeft": "Dismiss",
-                                "buttonRight": "Update",
-                                "timeout": 0,
-                            }
-                            self.SendToPanel(self.GeneratePopupNotify(update_message))
-                        self.display_display_update = False
-                    else:
-                        # Normal startup
-                        self.HandleScreensaver()
-                else:
+                if self.firmware_check != 'notify':
                     # startup without check
                     self.HandleScreensaver()
+                elif not self.berry_driver_version:
+                    # versions are checked when the driver version is received
+                    self.version_check_pending = True
+                    self.HandleScreensaver()
+                elif not self._check_versions():
+                    # Normal startup
+                    self.HandleScreensaver()
+                # panel is rendered completely after startup
+                self._resync_panel(render=False)
+                nspanel_engine.StartupAdmission.release(self.get_fullname())
 
             elif method == 'sleepReached':
                 # event,sleepReached,cardEntities
@@ -894,24 +1583,107 @@ class NSPanel(MqttPlugin):
 
             elif method == 'pageOpenDetail':
                 # event,pageOpenDetail,popupLight,entity
-                self.GenerateDetailPage(words[2], words[3])
+                # the panel opened the popup on its own, the cached frames do not reflect the display anymore
+                self.frame_cache.invalidate()
+                self.GenerateDetailPage(event.action, event.page)
 
             elif method == 'buttonPress2':
-                self.HandleButtonEvent(words)
+                self.HandleButtonEvent(event)
 
-            elif method == 'button1':
-                self.HandleHardwareButton(method)
+            elif method == 'button1' or method == 'button2':
+                # event,button1[,state]
+                self.HandleHardwareButton(method, event.value)
 
-            elif method == 'button2':
-                self.HandleHardwareButton(method)
+    def _check_versions(self) -> bool:
+        """
+        Check the versions of driver, panel model and display firmware and notify about needed updates
+
+        :return:    True if an update is needed
+        """
+
+        # Check driver version
+        if int(self.berry_driver_version) < self.desired_berry_driver_version:
+            self.logger.warning(
+                f"Update of Tasmota Driver needed! installed: {self.berry_driver_version} required: {self.desired_berry_driver_version}")
+            if self.display_driver_update:
+                update_message = {
+                    "entity": "driverUpdate",
+                    "heading": "Driver Update available!",
+                    "text": ("There's an update available for the Tasmota\r\n"
+                             "Berry driver, do you want to start the update\r\n"
+                             "now?\r\n"
+                             "If you encounter issues after the update or\r\n"
+                             "this message appears frequently, please check\r\n"
+                             "the manual and repeat the installation steps\r\n"
+                             "for the Tasmota Berry driver."
+                             ),
+                    "buttonLeft": "Dismiss",
+                    "buttonRight": "Update",
+                    "timeout": 0,
+                }
+                self.SendToPanel(self.GeneratePopupNotify(update_message))
+            self.display_driver_update = False
+
+        # Check panel model
+        elif self.panel_model != self.desired_panel_model:
+            self.logger.warning(
+                f"Update of Display Firmware needed! installed: {self.panel_model} configured: {self.desired_panel_model}")
+            if self.display_display_update:
+                update_message = {
+                    "entity": "displayUpdate",
+                    "heading": "Display Update available!",
+                    "text": ("The configured model does not match to the\r\n"
+                             "installed firmware. Possible solutions:\r\n"
+                             f"- Set model to '{self.panel_model}' in configuration\r\n"
+                             "- Update the correct display firmware\r\n"
+                             "If the update fails check the installation manu-\r\n"
+                             "al and flash again over the Tasmota console\r\n"
+                             "Be patient, the update will take a while.\r\n"
+                             ),
+                    "buttonLeft": "Dismiss",
+                    "buttonRight": "Update",
+                    "timeout": 0,
+                }
+                self.SendToPanel(self.GeneratePopupNotify(update_message))
+
+        # Check display firmware version
+        elif int(self.display_firmware_version) < self.desired_display_firmware_version:
+            self.logger.warning(
+                f"Update of Display Firmware needed! installed: {self.display_firmware_version} required: {self.desired_display_firmware_version}")
+            if self.display_display_update:
+                update_message = {
+                    "entity": "displayUpdate",
+                    "heading": "Display Update available!",
+                    "text": ("There's a firmware update available for the\r\n"
+                             "Nextion screen of the NSPanel. Do you want to\r\n"
+                             "start the update now?\r\n"
+                             "If the update fails check the installation manu-\r\n"
+                             "al and flash again over the Tasmota console\r\n"
+                             "Be patient, the update will take a while."
+                             ),
+                    "buttonLeft": "Dismiss",
+                    "buttonRight": "Update",
+                    "timeout": 0,
+                }
+                self.SendToPanel(self.GeneratePopupNotify(update_message))
+            self.display_display_update = False
+        else:
+            return False
+        return True
 
     def HandleScreensaver(self):
         self.panel_status['screensaver_active'] = True
         self._set_item_value('item_screensaver_active', self.panel_status['screensaver_active'])
-        self.current_page = 1
-        self.lastPayload = [""]
-        screensaver = self.panel_config[0].get('pageType', 'screensaver')
-        self.publish_tasmota_topic(payload=f"pageType~{screensaver}")
+        self.page_stack = []
+        self.current_page = self._home_page()
+        self.displayed_page = None
+        if self.render_transaction is not None:
+            # screensaver replaces pages requested before
+            self.render_transaction['page'] = None
+        # panel may have switched to the screensaver on its own
+        self.frame_cache.invalidate()
+        screensaver = self.panel_config[0]['pageType']
+        self.SendToPanel(f"pageType~{screensaver}")
         self.send_current_time()
         self.send_current_date()
         self.HandleScreensaverIconUpdate()
@@ -920,9 +1692,9 @@ class NSPanel(MqttPlugin):
     def get_status_icons(self) -> str:
         self.logger.debug("get_status_icons called")
         screensaver = self.panel_config[0]
-        iconLeft = self.items.return_item(screensaver.get('statusIconLeft', None))()
-        iconRight = self.items.return_item(screensaver.get('statusIconRight', None))()
-        iconSize = screensaver.get('statusIconBig', True)
+        iconLeft = self.getItemValue(screensaver['statusIconLeft'])
+        iconRight = self.getItemValue(screensaver['statusIconRight'])
+        iconSize = screensaver['statusIconBig']
         if iconSize:
             iconSize = 1
         else:
@@ -946,8 +1718,10 @@ class NSPanel(MqttPlugin):
 
     def HandleScreensaverIconUpdate(self):
         self.logger.info('Function HandleScreensaverIconUpdate')
-        status_icons = self.get_status_icons()
-        self.publish_tasmota_topic(payload=f"statusUpdate~{status_icons}")
+        with self._render_context(0) as context:
+            key = ('statusUpdate', self.screensaver_key, repr(sorted(context.values.items())),
+                   self._get_screensaver_values())
+            self.SendToPanel(nspanel_frame.SharedFrameCache.get(key, lambda: f"statusUpdate~{self.get_status_icons()}"))
 
     def getWeatherIcon(self, weathercondition):
         """Get weather icon from weather data."""
@@ -972,102 +1746,211 @@ class NSPanel(MqttPlugin):
         return Icons.GetIcon(weatherMapping.get(weathercondition, "-"))
 
     def getItemValue(self, itemname):
-        item = self.items.return_item(itemname)
+        item = self._return_item(itemname)
         if item is not None:
-            return item()
+            return self._item_value(item)
         else:
             return itemname
 
+    def _return_item(self, path):
+        """
+        Return the item of the path (resolved only once) or None
+        """
+        return self.item_index.get(path)
+
+    def _item_value(self, item):
+        """
+        Return the value of an item, taken from the snapshot of the current render if available
+        """
+        if self.render_context is not None and item.property.path in self.render_context:
+            return self.render_context.get(item.property.path)
+        return item()
+
+    def _get_value(self, path, default=None):
+        item = self._return_item(path)
+        return self._item_value(item) if item is not None else default
+
+    @contextmanager
+    def _render_transaction(self):
+        """
+        Collect all renders requested while an event is handled (by the handler itself or by item
+        updates it causes) and render the page requested last once, when the handler returns
+        """
+        if self.render_transaction is not None:
+            yield self.render_transaction
+            return
+        transaction = self.render_transaction = {'page': None, 'requests': 0}
+        try:
+            yield transaction
+        finally:
+            self.render_transaction = None
+        if transaction['page'] is not None:
+            if transaction['requests'] > 1:
+                self.logger.debug(f"_render_transaction: {transaction['requests']} render requests combined to one for page={transaction['page']}")
+            self.GeneratePage(transaction['page'])
+
+    @contextmanager
+    def _render_context(self, page):
+        """
+        Read the values of all items of the page into a snapshot used while rendering.
+        A nested render uses the snapshot of the outer one.
+        """
+        if self.render_context is not None:
+            yield self.render_context
+            return
+        self.render_context = nspanel_render.RenderContext(page, self.panel_config_items_page.get(page, []), self.item_index)
+        # show expected values of writes not yet confirmed by the actuators
+        for path, pending in self.pending_writes.items():
+            if path in self.render_context:
+                self.render_context.values[path] = pending['value']
+        try:
+            yield self.render_context
+            for path, value in self.render_context.values.items():
+                # expected values of pending writes are not remembered, so the confirmation is not filtered
+                if path not in self.pending_writes:
+                    self.last_values[path] = self._display_value(path, value)
+        finally:
+            self.render_context = None
+
+    def _display_value(self, path, value):
+        """
+        Return a compact representation of a value as it is displayed, used to detect changes
+        """
+        text = self.value_formats.format(path, value)
+        return text if len(text) <= 64 else hash(text)
+
+    def _get_formatted_value(self, path):
+        """
+        Return the value of an item formatted according to the format spec of its entity,
+        or path itself if it is no item
+        """
+        item = self._return_item(path)
+        if item is None:
+            return path
+        return self.value_formats.format(path, self._item_value(item))
+
+    def _get_item_formats(self, panel_config, report: list) -> dict:
+        """
+        Collect the format specs (precision, unit, decimalSeparator) of the items of the page config
+        """
+        language_separator = nspanel_render.decimal_separator(self.language)
+        invalid_pages = self._get_invalid_pages(report)
+        formats = {}
+        for idx, card in enumerate(panel_config):
+            # invalid pages are not rendered, they may miss required keys and defaults
+            if idx in invalid_pages or not isinstance(card, dict):
+                continue
+            if card.get('pageType') == 'cardThermo' and card.get('item_temp_current'):
+                formats[card['item_temp_current']] = {'precision': card.get('precision'), 'unit': '',
+                                                      'decimalSeparator': card.get('decimalSeparator') or language_separator}
+            entities = card.get('entities')
+            for entity in entities if isinstance(entities, list) else []:
+                if not isinstance(entity, dict):
+                    continue
+                spec = nspanel_render.format_spec(entity, language_separator)
+                if spec is None:
+                    continue
+                for key in ('item', 'text'):
+                    path = entity.get(key)
+                    if isinstance(path, str) and path:
+                        formats[path] = spec
+        return formats
+
     def HandleScreensaverWeatherUpdate(self):
         self.logger.info('Function HandleScreensaverWeatherUpdate')
-        screensaver_config = self.panel_config[0]
-        entities = screensaver_config.get('entities', {})
-
-        if entities:
-
-            pageData = f"weatherUpdate~"
-            alternativeData = ""
-
-            maxEntities = 5
-            if screensaver_config.get('pageType', 'screensaver') == 'screensaver2':
-                maxEntities = 15
-            for idx, entity in enumerate(entities):
-                if idx >= maxEntities:
-                    break
-
-                heading = self.getItemValue(entity.get('heading', ''))
-                item = self.getItemValue(entity.get('item', ''))
-                icon = self.getItemValue(entity.get('icon', ''))
-                iconColor = self.getItemValue(entity.get('iconColor', 'White'))
-                text = self.getItemValue(entity.get('text', ''))
-
-                if iconColor == "weather":
-                    weatherCondition = getWeatherCondition(icon, self.items.return_item('env.location.day')() or idx > 0)
-                    icon = self.getWeatherIcon(weatherCondition)
-                    iconColor = Colors.GetColor(weatherCondition)
-
-                inactive = False
-                if iconColor == "item":
-                    if item:
-                        iconColor = self.defaultOnColor
-                    else:
-                        inactive = True
-                        iconColor = self.defaultOffColor
+        if not self.panel_config[0]['entities']:
+            return
+        with self._render_context(0) as context:
+            key = ('weatherUpdate', self.screensaver_key, repr(sorted(context.values.items())),
+                   self._get_screensaver_values(),
+                   self._get_value('env.location.day'))
+            self.SendToPanel(nspanel_frame.SharedFrameCache.get(key, self.GenerateScreensaverWeather))
 
-                icon = Icons.GetIcon(icon, inactive)
-                iconColor = Colors.GetColor(iconColor)
+    def GenerateScreensaverWeather(self) -> list:
+        with self._render_context(0):
+            screensaver_config = self.panel_config[0]
+            entities = screensaver_config['entities']
 
-                # Handle to long strings, if no icon was found
-                if idx < 4 or idx > 9:
-                    icon = str(icon)[:2]
+            if entities:
 
-                if screensaver_config.get('alternativeLayout', False) and idx == 1:
-                    alternativeData = f"ignore~ignore~ignore~ignore~ignore~ignore~ignore~ignore~{icon}~{iconColor}~{heading}~{text}~"
-                else:
-                    pageData = f"{pageData}ignore~ignore~{icon}~{iconColor}~{heading}~{text}~"
-
-            pageData = f"{pageData}{alternativeData}"
-
-            out_msgs = list()
-            out_msgs.append(pageData)
-
-            # set colors
-            background = Colors.GetColor(self.defaultBackgroundColor)
-            timestr = Colors.GetColor(self.defaultColor)
-            timeAPPM = Colors.GetColor(self.defaultColor)
-            date = Colors.GetColor(self.defaultColor)
-            cMainText = Colors.GetColor(self.defaultColor)
-            cForecast1 = Colors.GetColor(self.defaultColor)
-            cForecast2 = Colors.GetColor(self.defaultColor)
-            cForecast3 = Colors.GetColor(self.defaultColor)
-            cForecast4 = Colors.GetColor(self.defaultColor)
-            cForecast1Val = Colors.GetColor(self.defaultColor)
-            cForecast2Val = Colors.GetColor(self.defaultColor)
-            cForecast3Val = Colors.GetColor(self.defaultColor)
-            cForecast4Val = Colors.GetColor(self.defaultColor)
-            bar = Colors.GetColor(self.defaultColor)
-            tMR = Colors.GetColor(self.defaultColor)
-            tTimeAdd = Colors.GetColor(self.defaultColor)
-
-            out_msgs.append(f'color~{background}~'
-                            f'{timestr}~'
-                            f'{timeAPPM}~'
-                            f'{date}~'
-                            f'{cMainText}~'
-                            f'{cForecast1}~'
-                            f'{cForecast2}~'
-                            f'{cForecast3}~'
-                            f'{cForecast4}~'
-                            f'{cForecast1Val}~'
-                            f'{cForecast2Val}~'
-                            f'{cForecast3Val}~'
-                            f'{cForecast4Val}~'
-                            f'{bar}~'
-                            f'{tMR}~'
-                            f'{tMR}~'
-                            f'{tTimeAdd}'
-                            )
-            self.SendToPanel(out_msgs)
+                pageData = f"weatherUpdate~"
+                alternativeData = ""
+
+                # number of entities is limited during validation of the config
+                for idx, entity in enumerate(entities):
+                    heading = self.getItemValue(entity.get('heading', ''))
+                    item = self.getItemValue(entity.get('item', ''))
+                    icon = self.getItemValue(entity.get('icon', ''))
+                    iconColor = self.getItemValue(entity.get('iconColor', 'White'))
+                    text = self._get_formatted_value(entity.get('text', ''))
+
+                    if iconColor == "weather":
+                        weatherCondition = getWeatherCondition(icon, self._get_value('env.location.day') or idx > 0)
+                        icon = self.getWeatherIcon(weatherCondition)
+                        iconColor = Colors.GetColor(weatherCondition)
+
+                    inactive = False
+                    if iconColor == "item":
+                        if item:
+                            iconColor = self.defaultOnColor
+                        else:
+                            inactive = True
+                            iconColor = self.defaultOffColor
+
+                    icon = Icons.GetIcon(icon, inactive)
+                    iconColor = Colors.GetColor(iconColor)
+
+                    # Handle to long strings, if no icon was found
+                    if idx < 4 or idx > 9:
+                        icon = str(icon)[:2]
+
+                    if screensaver_config['alternativeLayout'] and idx == 1:
+                        alternativeData = f"ignore~ignore~ignore~ignore~ignore~ignore~ignore~ignore~{icon}~{iconColor}~{heading}~{text}~"
+                    else:
+                        pageData = f"{pageData}ignore~ignore~{icon}~{iconColor}~{heading}~{text}~"
+
+                pageData = f"{pageData}{alternativeData}"
+
+                out_msgs = list()
+                out_msgs.append(pageData)
+
+                # set colors
+                background = Colors.GetColor(self.defaultBackgroundColor)
+                timestr = Colors.GetColor(self.defaultColor)
+                timeAPPM = Colors.GetColor(self.defaultColor)
+                date = Colors.GetColor(self.defaultColor)
+                cMainText = Colors.GetColor(self.defaultColor)
+                cForecast1 = Colors.GetColor(self.defaultColor)
+                cForecast2 = Colors.GetColor(self.defaultColor)
+                cForecast3 = Colors.GetColor(self.defaultColor)
+                cForecast4 = Colors.GetColor(self.defaultColor)
+                cForecast1Val = Colors.GetColor(self.defaultColor)
+                cForecast2Val = Colors.GetColor(self.defaultColor)
+                cForecast3Val = Colors.GetColor(self.defaultColor)
+                cForecast4Val = Colors.GetColor(self.defaultColor)
+                bar = Colors.GetColor(self.defaultColor)
+                tMR = Colors.GetColor(self.defaultColor)
+                tTimeAdd = Colors.GetColor(self.defaultColor)
+
+                out_msgs.append(f'color~{background}~'
+                                f'{timestr}~'
+                                f'{timeAPPM}~'
+                                f'{date}~'
+                                f'{cMainText}~'
+                                f'{cForecast1}~'
+                                f'{cForecast2}~'
+                                f'{cForecast3}~'
+                                f'{cForecast4}~'
+                                f'{cForecast1Val}~'
+                                f'{cForecast2Val}~'
+                                f'{cForecast3Val}~'
+                                f'{cForecast4Val}~'
+                                f'{bar}~'
+                                f'{tMR}~'
+                                f'{tMR}~'
+                                f'{tTimeAdd}'
+                                )
+                return out_msgs
 
     def GenerateScreensaverNotify(self, value) -> list:
         self.logger.debug(f"GenerateScreensaverNotify called with item={value}")
@@ -1081,11 +1964,90 @@ class NSPanel(MqttPlugin):
         out_msgs.append(f"notify~{heading}~{text}")
         return out_msgs
 
-    def HandleHardwareButton(self, method):
-        self.logger.info(f"hw {method} pressed")
-        # TODO switch to hidden page
-        # TODO direct toggle item
-        self.GeneratePage(self.current_page)
+    def HandleHardwareButton(self, method, state=None):
+        """
+        Handle a hardware button according to its mapping. state is the Tasmota button state
+        if the rule sends it: 1/ON = pressed, 0/OFF = released, 3/HOLD = long press,
+        10/11 = single/double press detected by Tasmota. Without state each event is a press.
+        """
+
+        self.logger.info(f"hw {method} pressed, state={state}")
+        mapping = self.hw_buttons.get(method)
+        if not mapping:
+            self.GeneratePage(self.current_page)
+            return
+
+        button = self.hw_button_state[method]
+        state = str(state).upper() if state is not None else None
+        if state in ('1', 'ON'):
+            button['pressed'] = time.time()
+            return
+        if state in ('3', 'HOLD'):
+            button['pressed'] = None
+            self._run_button_action(method, 'long')
+            return
+        if state == '11':
+            self._run_button_action(method, 'double')
+            return
+        if state in ('0', 'OFF'):
+            pressed, button['pressed'] = button['pressed'], None
+            if pressed is None:
+                # release after a long press reported by HOLD
+                return
+            if 'long' in mapping and time.time() - pressed >= self.button_long_press_time:
+                self._run_button_action(method, 'long')
+                return
+
+        # single press is executed at once, if no double press is configured
+        if 'double' not in mapping:
+            self._run_button_action(method, 'press')
+            return
+        if button['timer'] is not None:
+            self._remove_timer(button['timer'])
+            button['timer'] = None
+            self._run_button_action(method, 'double')
+            return
+        button['timer'] = f"double_press_{method}"
+        self._add_timer(button['timer'], lambda: self._button_press_timeout(method), delay=self.button_double_press_time)
+
+    def _button_press_timeout(self, method):
+        button = self.hw_button_state[method]
+        if button['timer'] is None:
+            # second press was handled in the meantime
+            return
+        button['timer'] = None
+        self._run_button_action(method, 'press')
+
+    def _run_button_action(self, method, press):
+        """
+        Execute the action of a hardware button directly on the item (or jump to a page)
+        """
+
+        action = self.hw_buttons[method].get(press)
+        if action is None:
+            self.logger.debug(f"no action defined for {press} of {method}")
+            return
+
+        if action['action'] == 'page':
+            page = self.getPageByName(action['page'])
+            if page is None:
+                self.logger.warning(f"page {action['page']} of {method} not found")
+                return
+            self._goto_page(page)
+            return
+
+        item = self._return_item(action['item'])
+        if item is None:
+            self.logger.warning(f"item {action['item']} of {method} not found")
+            return
+        if action['action'] == 'toggle':
+            item(not item(), self.get_shortname(), method)
+        else:
+            item(action['value'], self.get_shortname(), method)
+
+        # keep the display in line, if the item is shown on the current page
+        if not self.panel_status['screensaver_active'] and item.property.path in self.panel_config_items_page[self.current_page]:
+            self.actor.debounce('render', 0.05, self._render_current_page)
 
     def getEntityByName(self, name: str = ""):
         entities = self.panel_config[self.current_page]['entities']
@@ -1093,45 +2055,48 @@ class NSPanel(MqttPlugin):
         return entity
 
     def getPageByName(self, name: str = ""):
-        cards = self.panel_config
-        for idx, card in enumerate(cards):
-            if card.get("entity", None) == name:
-                return idx
+        return self.page_index.get(name)
 
-    def HandleButtonEvent(self, words):
+    def HandleButtonEvent(self, event):
 
-        # words=['event', 'buttonPress2', 'licht.eg.tv_wand_nische', 'OnOff', '1']
+        # event=PanelEvent(method=buttonPress2, page=licht.eg.tv_wand_nische, action=OnOff, value=1)
 
-        pageName = words[2]
-        buttonAction = words[3]
+        pageName = event.page
+        buttonAction = event.action
 
         self.logger.debug(
-            f"HandleButtonEvent: {words[0]} - {words[1]} - {words[2]} - {words[3]} - current_page={self.current_page}")
+            f"HandleButtonEvent: {event} - current_page={self.current_page}")
 
-        if 'navigate' in pageName:
-            self.GeneratePage(pageName[8:len(pageName)])
+        if pageName.startswith('navigate.'):
+            page = self.getPageByName(pageName[9:])
+            if page is None:
+                self.logger.warning(f"page {pageName[9:]} to navigate to not found")
+            else:
+                self._navigate_to(page)
+            return
 
         if buttonAction == 'bExit':
             if pageName == 'popupNotify' and self.panel_status['screensaver_active']:
                 self.HandleScreensaver()
             else:
-                if len(words) <= 4 or not self.panel_config[0].get('doubleTapToUnlock', False) or int(words[4]) >= 2:
-                    self.lastPayload = [""]
+                if event.number is None or not self.panel_config[0]['doubleTapToUnlock'] or event.number >= 2:
+                    self.frame_cache.invalidate()
                     self.GeneratePage(self.current_page)
 
         elif buttonAction == 'OnOff':
-            value = int(words[4])
+            value = event.number
             entity = self.getEntityByName(pageName)
             item_name = entity.get('item', '')
-            item = self.items.return_item(item_name)
+            item = self._return_item(item_name)
             if item is not None:
                 value = entity.get('onValue', 1) if value else entity.get('offValue', 0)
                 self.logger.debug(f"item={item.id()} will be set to new value={value}")
-                item(value, self.get_shortname())
+                # the panel already shows the new state of the switch
+                self._write_optimistic(entity, item, value)
 
         elif buttonAction == 'number-set' or buttonAction == 'positionSlider' or buttonAction == 'tiltSlider':
             self.logger.debug(f"{buttonAction} called with with pageName={pageName}")
-            value = int(words[4])
+            value = event.number
             entity = self.getEntityByName(pageName)
             itemconfigname = 'item'
             scaled_value = value  # no scaling for number-set
@@ -1149,16 +2114,16 @@ class NSPanel(MqttPlugin):
                 itemconfigname = 'item_speed'
                 scaled_value = value * entity.get("percentage_step", 25)
 
-            item = self.items.return_item(entity.get(itemconfigname, None))
+            item = self._return_item(entity.get(itemconfigname, None))
             if item is not None:
                 self.logger.debug(f"item={item.id()} will be set to new scaled_value={scaled_value}")
                 item(scaled_value, self.get_shortname())
 
         elif buttonAction == 'brightnessSlider':
-            value = int(words[4])
+            value = event.number
             self.logger.debug(f"brightnessSlider called with pageName={pageName}")
             entity = self.getEntityByName(pageName)
-            item = self.items.return_item(entity.get('item_brightness', None))
+            item = self._return_item(entity.get('item_brightness', None))
             scaled_value = scale(value, (0, 100),
                                  (entity.get('min_brightness', "0"), entity.get('max_brightness', "100")))
             if item is not None:
@@ -1166,10 +2131,10 @@ class NSPanel(MqttPlugin):
                 item(scaled_value, self.get_shortname())
 
         elif buttonAction == 'colorTempSlider':
-            value = int(words[4])
+            value = event.number
             self.logger.debug(f"colorTempSlider called with pageName={pageName}")
             entity = self.getEntityByName(pageName)
-            item = self.items.return_item(entity.get('item_temperature', None))
+            item = self._return_item(entity.get('item_temperature', None))
             scaled_value = scale(value, (100, 0),
                                  (entity.get('min_temperature', "0"), entity.get('max_temperature', "100")))
             if item is not None:
@@ -1177,10 +2142,10 @@ class NSPanel(MqttPlugin):
                 item(scaled_value, self.get_shortname())
 
         elif buttonAction == 'colorWheel':
-            value = words[4]
+            value = event.value
             self.logger.debug(f"colorWheel called with pageName={pageName}")
             entity = self.getEntityByName(pageName)
-            item = self.items.return_item(entity.get('item_color', None))
+            item = self._return_item(entity.get('item_color', None))
             value = value.split('|')
             rgb = pos_to_color(int(value[0]), int(value[1]), int(value[2]))
             red = rgb[0]
@@ -1198,14 +2163,19 @@ class NSPanel(MqttPlugin):
             self._previous_page()
             self.GeneratePage(self.current_page)
 
+        elif buttonAction == 'bUp':
+            self._navigate_up()
+
         elif buttonAction == 'button':
             self.logger.debug(f"button called with pageName={pageName}")
             if pageName == '':
                 self.logger.warning('no pageName given')
 
             elif pageName == 'bHome':
-                self.current_page = 1
-                self.GeneratePage(self.current_page)
+                self._goto_page(self._home_page())
+
+            elif pageName == 'bUp':
+                self._navigate_up()
 
             elif pageName == 'bNext':
                 self._next_page()
@@ -1217,7 +2187,7 @@ class NSPanel(MqttPlugin):
 
             elif pageName == 'alarm-button':
                 item_name = self.panel_config[self.current_page].get('item_icon2', '')
-                item = self.items.return_item(item_name)
+                item = self._return_item(item_name)
                 if item is not None:
                     value = not item()
                     self.logger.debug(f"item={item.id()} will be set to new value={value}")
@@ -1237,7 +2207,7 @@ class NSPanel(MqttPlugin):
                 # button / light / switch / text / etc.
                 else:
                     item_name = entity['item']
-                    item = self.items.return_item(item_name)
+                    item = self._return_item(item_name)
                     if item is not None:
                         if entity['type'] == 'text':
                             self.logger.debug(f"item={item.id()} will get no update because it's text")
@@ -1251,28 +2221,23 @@ class NSPanel(MqttPlugin):
                             value = item()
                             value = entity.get('offValue', 0) if value else entity.get('onValue', 1)
                             self.logger.debug(f"item={item.id()} will be set to new value={value}")
-                            item(value, self.get_shortname())
+                            self._write_optimistic(entity, item, value)
 
-                        # perhaps a complete reload with self.GeneratePage(self.current_page) is necessary in other cases
-                        if self.panel_config[self.current_page]['pageType'] == 'cardMedia':
-                            self.GeneratePage(self.current_page)
-                        else:
-                            # Reload Page with new item value
-                            self.SendToPanel(self.GeneratePageElements(self.current_page))
+                        # Reload Page with new item value, unchanged frames are not sent again
+                        self.GeneratePage(self.current_page)
 
         elif buttonAction == 'tempUpd':
-            value = int(words[4]) / 10
+            value = event.number / 10
             page_content = self.panel_config[self.current_page]
-            tempitem = page_content.get('item_temp_set', 'undefined')
-            self.items.return_item(tempitem)(value)
+            tempitem = page_content['item_temp_set']
+            self._return_item(tempitem)(value)
             self.GeneratePage(self.current_page)
 
         elif buttonAction == 'hvac_action':
-            value = int(words[4])
-            if value < 99:
-                page_content = self.panel_config[self.current_page]
-                hvacitem = page_content.get('item_mode', 'undefined')
-                self.items.return_item(hvacitem)(value)
+            value = event.number
+            hvacitem = self._return_item(self.panel_config[self.current_page]['item_mode'])
+            if value < 99 and hvacitem is not None:
+                hvacitem(value)
             else:
                 self.logger.debug("no valid hvac action")
             self.GeneratePage(self.current_page)
@@ -1283,7 +2248,7 @@ class NSPanel(MqttPlugin):
             entity = self.getEntityByName(pageName)
             value = entity.get('upValue', 0)
             item_name = entity['item']
-            item = self.items.return_item(item_name)
+            item = self._return_item(item_name)
 
             if item is not None:
                 self.logger.debug(f"item={item.id()} will be set to new value={value}")
@@ -1294,7 +2259,7 @@ class NSPanel(MqttPlugin):
             entity = self.getEntityByName(pageName)
             value = entity.get('downValue', 1)
             item_name = entity['item']
-            item = self.items.return_item(item_name)
+            item = self._return_item(item_name)
 
             if item is not None:
                 self.logger.debug(f"item={item.id()} will be set to new value={value}")
@@ -1305,37 +2270,36 @@ class NSPanel(MqttPlugin):
             value = 1
             entity = self.getEntityByName(pageName)
             item_name = entity['item_stop']
-            item = self.items.return_item(item_name)
+            item = self._return_item(item_name)
 
             if item is not None:
                 self.logger.debug(f"item={item.id()} will be set to new value={value}")
                 item(value, self.get_shortname())
 
-        elif buttonAction[:10] == 'alarm-mode':
+        elif buttonAction.startswith('alarm-mode'):
             entities = self.panel_config[self.current_page]['entities']
             self.logger.debug(f"Button {buttonAction} pressed")
-            password = words[4]
+            password = event.value or ''
 
-            if len(buttonAction) > 10:
+            if event.option:
                 setNewMode = False
                 anyItemTrue = False
                 navigateTo = False
                 for idx, entity in enumerate(entities):
                     storedPassword = entity.get('password', '')
                     page = entity.get('page', None)
-                    if idx == int(buttonAction[10:]) and page:
+                    if idx == int(event.option) and page:
                         navigateTo = True
                         if password.isdigit():
                             password = int(password)
-                        if password == storedPassword:
-                            self.current_page = self.getPageByName(page)
+                        if password == storedPassword and self.getPageByName(page) is not None:
                             self.logger.debug("Password correct")
-                            self.GeneratePage(self.current_page)
+                            self._navigate_to(self.getPageByName(page))
                         else:
                             self.logger.debug("Password incorrect")
                         break
                     else:
-                        item = self.items.return_item(entity.get('item'))
+                        item = self._return_item(entity.get('item'))
 
                         if item is not None and item():
                             anyItemTrue = True
@@ -1353,65 +2317,65 @@ class NSPanel(MqttPlugin):
 
                 if (setNewMode or not anyItemTrue) and not navigateTo:
                     for idx, entity in enumerate(entities):
-                        if idx == int(buttonAction[10:]):
+                        if idx == int(event.option):
                             value = True
                         else:
                             value = False
-                        self.items.return_item(entity.get('item'))(value)
+                        self._return_item(entity.get('item'))(value)
             else:
                 self.logger.warning(f"buttonAction: {buttonAction} too short")
 
         elif buttonAction == 'timer-start':
-            parameter = words[4]
+            parameter = event.value
             self.logger.debug(f"timer-start called with pageName={pageName} and parameter={parameter}")
             timer = parameter.split(':')
             seconds = (int(timer[0]) * 60 + int(timer[1])) * 60 + int(timer[2]) + 1
             entity = self.getEntityByName(pageName)
-            item = self.items.return_item(entity.get('item', None))
+            item = self._return_item(entity.get('item', None))
             if item is not None:
                 self.logger.debug(f"item={item.id()} will be set to value={seconds - 1}")
                 item(seconds, self.get_shortname())
 
-        elif buttonAction[:6] == 'timer-':
+        elif buttonAction.startswith('timer-'):
             self.logger.debug(f"timer custom command to be implemented")
 
         elif buttonAction == 'mode-preset_modes':
-            action = buttonAction[5:]  # unused
-            parameter = words[4]
+            action = event.option  # unused
+            parameter = event.number
             self.logger.debug(
                 f"mode-preset_modes called with pageName={pageName}, action={action} and parameter={parameter}")
             entity = self.getEntityByName(pageName)
             preset_modes = entity['preset_modes']
             item_name = entity['item_preset']
-            item = self.items.return_item(item_name)
-            value = str(preset_modes[int(parameter)])
+            item = self._return_item(item_name)
+            value = str(preset_modes[parameter])
             item(value, self.get_shortname())
             self.SendToPanel(self.GenerateDetailFan(pageName))
 
-        elif buttonAction[:5] == 'mode-':
-            action = buttonAction[5:]  # unused
-            parameter = words[4]
+        elif buttonAction.startswith('mode-'):
+            action = event.option  # unused
+            parameter = event.number
             self.logger.debug(f"mode called with pageName={pageName}, action={action} and parameter={parameter}")
             entity = self.getEntityByName(pageName)
             options = entity['options']
             option_list = options.split("?")
             item_name = entity['item']
-            item = self.items.return_item(item_name)
-            value = str(option_list[int(parameter)])
+            item = self._return_item(item_name)
+            value = str(option_list[parameter])
             item(value, self.get_shortname())
             self.GeneratePage(self.current_page)
 
-        elif buttonAction[:6] == 'media-':
-            action = buttonAction[6:]
+        elif buttonAction.startswith('media-'):
+            action = event.option
             self.logger.debug(f"media called with pageName={pageName} and action={action}")
             page_content = self.panel_config[self.current_page]
             if action == "OnOff":
-                item_OnOff = self.items.return_item(page_content.get('item_OnOff', 'undefined'))
+                item_OnOff = self._return_item(page_content['item_OnOff'])
                 value = not item_OnOff()
                 item_OnOff(value, self.get_shortname())
             elif action == "pause":
-                item_play = self.items.return_item(page_content.get('item_play', 'undefined'))
-                item_pause = self.items.return_item(page_content.get('item_pause', 'undefined'))
+                item_play = self._return_item(page_content['item_play'])
+                item_pause = self._return_item(page_content['item_pause'])
                 if item_play is not None and item_pause is not None:
                     if item_pause():
                         item_pause(False, self.get_shortname())
@@ -1420,15 +2384,15 @@ class NSPanel(MqttPlugin):
                     else:
                         item_play(True, self.get_shortname())
             elif action == "back":
-                item_back = self.items.return_item(page_content.get('item_back', 'undefined'))
+                item_back = self._return_item(page_content['item_back'])
                 if item_back is not None:
                     item_back(True, self.get_shortname())
             elif action == "next":
-                item_next = self.items.return_item(page_content.get('item_next', 'undefined'))
+                item_next = self._return_item(page_content['item_next'])
                 if item_next is not None:
                     item_next(True, self.get_shortname())
             elif action == "shuffle":
-                item_shuffle = self.items.return_item(page_content.get('item_shuffle', 'undefined'))
+                item_shuffle = self._return_item(page_content['item_shuffle'])
                 if item_shuffle is not None:
                     value = not item_shuffle()
                     item_shuffle(value, self.get_shortname())
@@ -1438,19 +2402,19 @@ class NSPanel(MqttPlugin):
             self.GeneratePage(self.current_page)
 
         elif buttonAction == 'volumeSlider':
-            parameter = words[4]
+            parameter = event.number
             self.logger.debug(f"volumeSlider called with pageName={pageName} and parameter={parameter}")
             page_content = self.panel_config[self.current_page]
-            item_volume = self.items.return_item(page_content.get('item_volume', 'undefined'))
+            item_volume = self._return_item(page_content['item_volume'])
             if item_volume is not None:
-                if int(words[4]) == 65535:
+                if parameter == 65535:
                     self.logger.info("volumeSlider underflow setting parameter to 0 - redraw page")
                     self.GeneratePage(self.current_page)
                 else:
                     item_volume(parameter, self.get_shortname())
 
         elif buttonAction == 'notifyAction':
-            parameter = words[4]
+            parameter = event.value
             self.logger.debug(f"notifyAction called with pageName={pageName} and parameter={parameter}")
             if pageName == 'driverUpdate':
                 if parameter == 'yes':
@@ -1462,6 +2426,9 @@ class NSPanel(MqttPlugin):
                     self.update_display_firmware(self.desired_display_firmware_url)
                 else:
                     self.SendToPanel('exitPopup')
+            elif pageName == 'configError':
+                self.frame_cache.invalidate()
+                self.GeneratePage(self.current_page)
             else:
                 self.logger.warning(f"notifyAction to be implemented")
 
@@ -1504,50 +2471,93 @@ class NSPanel(MqttPlugin):
 
         self.logger.debug(f"GeneratePage called with page={page}")
 
+        if self.render_transaction is not None:
+            # rendered once, when the handled event is finished
+            self.render_transaction['page'] = page
+            self.render_transaction['requests'] += 1
+            return
+
+        if not self.panel_status['online']:
+            # rendered when the panel is online again and the page is visible
+            self.dirty_pages.add(page)
+            self.logger.debug(f"GeneratePage: panel is offline, page={page} is not rendered")
+            return
+
+        if page in self.invalid_pages:
+            self._show_invalid_page(page)
+            return
+
         self.panel_status['screensaver_active'] = False
         self._set_item_value('item_screensaver_active', self.panel_status['screensaver_active'])
+        self.dirty_pages.discard(page)
+        self.displayed_page = page
         page_content = self.panel_config[page]
 
-        if page_content['pageType'] == 'cardEntities':
-            self.SendToPanel(self.GenerateEntitiesPage(page))
+        with self._render_context(page):
+            if page_content['pageType'] == 'cardEntities':
+                self.SendToPanel(self.GenerateEntitiesPage(page))
 
-        elif page_content['pageType'] == 'cardThermo':
-            self.SendToPanel(self.GenerateThermoPage(page))
+            elif page_content['pageType'] == 'cardThermo':
+                self.SendToPanel(self.GenerateThermoPage(page))
 
-        elif page_content['pageType'] == 'cardGrid':
-            self.SendToPanel(self.GenerateGridPage(page))
+            elif page_content['pageType'] == 'cardGrid':
+                self.SendToPanel(self.GenerateGridPage(page))
 
-        elif page_content['pageType'] == 'cardMedia':
-            self.SendToPanel(self.GenerateMediaPage(page))
+            elif page_content['pageType'] == 'cardMedia':
+                self.SendToPanel(self.GenerateMediaPage(page))
 
-        elif page_content['pageType'] == 'cardAlarm' or page_content['pageType'] == 'cardUnlock':
-            self.SendToPanel(self.GenerateAlarmPage(page))
+            elif page_content['pageType'] == 'cardAlarm' or page_content['pageType'] == 'cardUnlock':
+                self.SendToPanel(self.GenerateAlarmPage(page))
 
-        elif page_content['pageType'] == 'cardQR':
-            self.SendToPanel(self.GenerateQRPage(page))
+            elif page_content['pageType'] == 'cardQR':
+                self.SendToPanel(self.GenerateQRPage(page))
 
-        elif page_content['pageType'] == 'cardPower':
-            self.SendToPanel(self.GeneratePowerPage(page))
+            elif page_content['pageType'] == 'cardPower':
+                self.SendToPanel(self.GeneratePowerPage(page))
 
-        elif page_content['pageType'] == 'cardChart' or page_content['pageType'] == 'cardLChart':
-            self.SendToPanel(self.GenerateChartPage(page))
+            elif page_content['pageType'] == 'cardChart' or page_content['pageType'] == 'cardLChart':
+                self.SendToPanel(self.GenerateChartPage(page))
+
+    def _show_invalid_page(self, page):
+        """
+        A page with errors in its config is not displayed. The panel returns to the page displayed before
+        (or the screensaver) and shows a notification with the first error of the page.
+        """
+
+        errors = [entry['message'] for entry in self.config_report if entry['page'] == page and entry['level'] == 'error']
+        self.logger.warning(f"page={page} has errors in config and is not displayed: {errors}")
+
+        fallback = self.displayed_page
+        if fallback is None or fallback == page or fallback in self.invalid_pages:
+            self.HandleScreensaver()
+            return
+        if self.page_stack and self.page_stack[-1]['page'] == fallback:
+            self.page_stack.pop()
+        self.current_page = fallback
+        self.GeneratePage(fallback)
+        self.SendToPanel(self.GeneratePopupNotify({'entity': 'configError',
+                                                   'heading': self._get_locale('popupNotify', 'configError'),
+                                                   'text': f"{self.panel_config[page].get('entity')}: {errors[0] if errors else ''}",
+                                                   'buttonRight': 'OK',
+                                                   'timeout': 10}))
 
     def GenerateDetailPage(self, page, entity: str):
         self.logger.debug(f"GenerateDetailPage called with page={page} entity={entity}")
-        if page == 'popupLight':
-            self.SendToPanel(self.GenerateDetailLight(entity))
-        elif page == 'popupShutter':
-            self.SendToPanel(self.GenerateDetailShutter(entity))
-        elif page == 'popupThermo':
-            self.SendToPanel(self.GenerateDetailThermo(entity))
-        elif page == 'popupInSel':
-            self.SendToPanel(self.GenerateDetailInSel(entity))
-        elif page == 'popupTimer':
-            self.SendToPanel(self.GenerateDetailTimer(entity))
-        elif page == 'popupFan':
-            self.SendToPanel(self.GenerateDetailFan(entity))
-        else:
-            self.logger.warning(f"unknown detail page {page}")
+        with self._render_context(self.current_page):
+            if page == 'popupLight':
+                self.SendToPanel(self.GenerateDetailLight(entity))
+            elif page == 'popupShutter':
+                self.SendToPanel(self.GenerateDetailShutter(entity))
+            elif page == 'popupThermo':
+                self.SendToPanel(self.GenerateDetailThermo(entity))
+            elif page == 'popupInSel':
+                self.SendToPanel(self.GenerateDetailInSel(entity))
+            elif page == 'popupTimer':
+                self.SendToPanel(self.GenerateDetailTimer(entity))
+            elif page == 'popupFan':
+                self.SendToPanel(self.GenerateDetailFan(entity))
+            else:
+                self.logger.warning(f"unknown detail page {page}")
 
     def GenerateEntitiesPage(self, page) -> list:
         self.logger.debug(f"GenerateEntitiesPage called with page={page}")
@@ -1575,28 +2585,28 @@ class NSPanel(MqttPlugin):
         # entityUpd~*heading*~*navigation*~*item*~*currentTemp*~*destTemp*~*status*~*minTemp*~*maxTemp*~*stepTemp*[[~*iconId*~*activeColor*~*state*~*hvac_action*]]~tCurTempLbl~tStateLbl~tALbl~iconTemperature~dstTempTwoTempMode~btDetail
         # [[]] are not part of the command~ this part repeats 8 times for the buttons
 
-        entity = page_content.get('entity', 'undefined')
-        heading = page_content.get('heading', 'undefined')
-        currentTemp = str(self.items.return_item(page_content.get('item_temp_current', 'undefined'))()).replace(".", ",")
-        destTemp = int(self.items.return_item(page_content.get('item_temp_set', 'undefined'))() * 10)
+        entity = page_content['entity']
+        heading = page_content['heading']
+        currentTemp = self._get_formatted_value(page_content['item_temp_current'])
+        destTemp = int(self._get_value(page_content['item_temp_set']) * 10)
         statusStr = 'MANU'
-        minTemp = int(page_content.get('minSetValue', 5) * 10)
-        maxTemp = int(page_content.get('maxSetValue', 30) * 10)
-        stepTemp = int(page_content.get('stepSetValue', 0.5) * 10)
+        minTemp = int(page_content['minSetValue'] * 10)
+        maxTemp = int(page_content['maxSetValue'] * 10)
+        stepTemp = int(page_content['stepSetValue'] * 10)
         icon_res = ''
 
-        mode = self.items.return_item(page_content.get('item_mode', None))()
+        mode = self.getItemValue(page_content['item_mode'])
         if mode is not None:
             mode = mode if (0 < mode < 5) else 1
             colorOn = Colors.GetColor('On')
             colorOff = Colors.GetColor('Off')
-            modes = {1: ('Komfort', Icons.GetIcon('alpha-a-circle'), (colorOn, colorOff, colorOff, colorOff),
+            modes = {1: (self._get_locale('thermostat', 'Comfort'), Icons.GetIcon('alpha-a-circle'), (colorOn, colorOff, colorOff, colorOff),
                          (1, 0, 0, 0)),
-                     2: ('Standby', Icons.GetIcon('power-standby'), (colorOff, colorOn, colorOff, colorOff),
+                     2: (self._get_locale('thermostat', 'Standby'), Icons.GetIcon('power-standby'), (colorOff, colorOn, colorOff, colorOff),
                          (0, 1, 0, 0)),
-                     3: ('Nacht', Icons.GetIcon('weather-night'), (colorOff, colorOff, colorOn, colorOff),
+                     3: (self._get_locale('thermostat', 'Night'), Icons.GetIcon('weather-night'), (colorOff, colorOff, colorOn, colorOff),
                          (0, 0, 1, 0)),
-                     4: ('Frost', Icons.GetIcon('head-snowflake'), (colorOff, colorOff, colorOff, colorOn),
+                     4: (self._get_locale('thermostat', 'Frost'), Icons.GetIcon('head-snowflake'), (colorOff, colorOff, colorOff, colorOn),
                          (0, 0, 0, 1)),
                      }
 
@@ -1615,7 +2625,7 @@ class NSPanel(MqttPlugin):
 
             icon_res = bt0 + bt1 + bt2 + bt3 + bt4 + bt5 + bt6 + bt7
 
-        thermoPopup = '' if page_content.get('popupThermoMode1', False) else 1
+        thermoPopup = '' if page_content['popupThermoMode1'] else 1
 
         PageData = (
             'entityUpd~'
@@ -1629,8 +2639,8 @@ class NSPanel(MqttPlugin):
             f'{maxTemp}~'  # Thermostat Max-Temperatur (numerisch ohne Komma in Zehntelgrad)
             f'{stepTemp}~'  # Schritte für Soll (0.5°C) (numerisch ohne Komma in Zehntelgrad)
             f'{icon_res}'  # Icons Status
-            f'Aktuell:~'  # Todo #f'{self._get_locale("thermostat", "Currently")}~'   # Bezeichner vor aktueller Raumtemperatur
-            f'Zustand:~'  # Todo #f'{self._get_locale("thermostat", "State")}~'       # Bezeichner vor State
+            f'{self._get_locale("thermostat", "Currently")}:~'  # Bezeichner vor aktueller Raumtemperatur
+            f'{self._get_locale("thermostat", "State")}:~'  # Bezeichner vor State
             f"~"  # tALbl ?
             f'{self.temperatureUnit}~'  # iconTemperature dstTempTwoTempMode
             f'~'  # dstTempTwoTempMode --> Wenn Wert, dann 2 Temperaturen
@@ -1644,31 +2654,25 @@ class NSPanel(MqttPlugin):
     def GenerateMediaPage(self, page) -> list:
         self.logger.debug(f"GenerateMediaPage called with page={page}")
         page_content = self.panel_config[page]
-        heading = page_content.get('heading', 'undefined')
-        entity = page_content.get('entity', 'undefined')
-        title = self.items.return_item(page_content.get('item_title', 'undefined'))
-        if title is not None:
-            title = title()
-        titleColor = page_content.get('titleColor', 65535)
-        author = self.items.return_item(page_content.get('item_author', 'undefined'))
-        if author is not None:
-            author = author()
-        authorColor = page_content.get('authorColor', 65535)
-        volume = self.items.return_item(page_content.get('item_volume', 'undefined'))
-        if volume is not None:
-            volume = volume()
+        heading = page_content['heading']
+        entity = page_content['entity']
+        title = self.getItemValue(page_content['item_title'])
+        titleColor = page_content['titleColor']
+        author = self.getItemValue(page_content['item_author'])
+        authorColor = page_content['authorColor']
+        volume = self.getItemValue(page_content['item_volume'])
         playPauseIcon = Icons.GetIcon('play-pause')
-        onOff = page_content.get('onOffBtn', '')
+        onOff = page_content['onOffBtn']
         if onOff == '':
             onOffBtn = 'disable'
         elif onOff == 0:
             onOffBtn = Colors.GetColor('White')
         else:
             onOffBtn = Colors.GetColor('On')
-        shuffle_item = self.items.return_item(page_content.get('iconShuffle', None))
-        if shuffle_item is None or shuffle_item() == '':
+        shuffle_item = self._return_item(page_content['iconShuffle'])
+        if shuffle_item is None or self._item_value(shuffle_item) == '':
             iconShuffle = 'disable'
-        elif shuffle == 0:
+        elif not self._item_value(shuffle_item):
             iconShuffle = Icons.GetIcon('shuffle-disabled')
         else:
             iconShuffle = Icons.GetIcon('shuffle')
@@ -1693,20 +2697,11 @@ class NSPanel(MqttPlugin):
         )
 
         # TODO could be merged with GeneratePageElements?
-        entities = page_content.get('entities', '{}')
-
-        maxPresets = 6
-        if len(entities) > maxPresets:
-            self.logger.warning(
-                f"Page definition contains too many Entities. Max allowed Entities for page={page_content['pageType']} is {maxPresets}")
-
-        for idx, entity in enumerate(entities):
+        for entity in page_content['entities']:
             self.logger.debug(f"entity={entity}")
-            if idx > maxPresets:
-                break
 
             name = entity.get('entity', '')
-            button = entity.get('type', 'delete')
+            button = entity['type']
             displayNameEntity = entity.get('displayNameEntity', 'Auswahl')
             if button == 'delete':
                 icon = ''
@@ -1729,33 +2724,30 @@ class NSPanel(MqttPlugin):
 
         page_content = self.panel_config[page]
         # default values
-        title = page_content.get('title', 'undefined')
-        cardEntity = page_content.get('entity', 'undefined')
+        title = page_content['title']
+        cardEntity = page_content['entity']
         arm = ['', '', '', '']
-        iconId = Icons.GetIcon(page_content.get('icon', 'home'))
-        iconColor = Colors.GetColor(page_content.get('color', 'White'))
+        iconId = Icons.GetIcon(page_content['icon'])
+        iconColor = Colors.GetColor(page_content['color'])
         numpadStatus = 'enable'
         flashing = 'disable'
-        icon2 = page_content.get('icon2', '')
+        icon2 = page_content['icon2']
         if icon2 != '':
             icon2 = Icons.GetIcon(icon2)
-        icon2Color = Colors.GetColor(page_content.get('icon2Color', self.defaultColor))
-        item_icon2 = page_content.get('item_icon2', '')
+        icon2Color = Colors.GetColor(page_content['icon2Color'] or self.defaultColor)
+        item_icon2 = page_content['item_icon2']
         if item_icon2 != '':
-            item2Action = self.items.return_item(item_icon2)
-            if item2Action():
-                icon2Color = Colors.GetColor(page_content.get('icon2OnColor', self.defaultOnColor))
+            item2Action = self._return_item(item_icon2)
+            if self._item_value(item2Action):
+                icon2Color = Colors.GetColor(page_content['icon2OnColor'] or self.defaultOnColor)
             else:
-                icon2Color = Colors.GetColor(page_content.get('icon2OffColor', self.defaultOffColor))
+                icon2Color = Colors.GetColor(page_content['icon2OffColor'] or self.defaultOffColor)
             # replace item with command name
             item_icon2 = 'alarm-button'
 
-        maxEntities = 4
-        for idx, entity in enumerate(page_content.get('entities', {})):
-            if idx >= maxEntities:
-                break
-            item = self.items.return_item(entity.get('item', None))
-            if item is not None and item():  # mode active
+        for idx, entity in enumerate(page_content['entities']):
+            item = self._return_item(entity.get('item', None))
+            if item is not None and self._item_value(item):  # mode active
                 iconId = Icons.GetIcon(entity.get('icon', 'home'))
                 iconColor = Colors.GetColor(entity.get('color', 'White'))
                 password = entity.get('password', '')
@@ -1799,20 +2791,20 @@ class NSPanel(MqttPlugin):
         out_msgs.append('pageType~cardQR')
 
         page_content = self.panel_config[page]
-        heading = page_content.get('heading', 'Default')
-        SSID = self.items.return_item(page_content.get('item_SSID', 'undefined'))()
-        Password = self.items.return_item(page_content.get('item_Password', 'undefined'))()
-        hiddenPWD = page_content.get('hidePassword', False)
-        iconColor = Colors.GetColor(page_content.get('iconColor', 'White'))
+        heading = page_content['heading']
+        SSID = self._get_value(page_content['item_SSID'])
+        Password = self._get_value(page_content['item_Password'])
+        hiddenPWD = page_content['hidePassword']
+        iconColor = Colors.GetColor(page_content['iconColor'])
 
         type1 = 'text'
         internalName1 = 'S'  # wird nicht angezeigt
         iconId1 = Icons.GetIcon('wifi')
-        displayName1 = 'SSID:'
+        displayName1 = f"{self._get_locale('wifi', 'SSID')}:"
         type2 = 'text'
         internalName2 = 'P'  # wird nicht angezeigt
         iconId2 = Icons.GetIcon('key')
-        displayName2 = 'Passwort:'
+        displayName2 = f"{self._get_locale('wifi', 'Password')}:"
 
         if hiddenPWD:
             type2 = 'disable'
@@ -1848,19 +2840,13 @@ class NSPanel(MqttPlugin):
         self.logger.debug(f"GeneratePowerPage called with page={page}")
         page_content = self.panel_config[page]
 
-        maxItems = 6
-
-        if len(page_content['entities']) > maxItems:
-            self.logger.warning(
-                f"Page definition contains too many Entities. Max allowed entities for page={page_content['pageType']} is {maxItems}")
-
         out_msgs = list()
         out_msgs.append('pageType~cardPower')
 
-        textHomeBelow = self.items.return_item(page_content['itemHomeBelow'])()
-        textHomeAbove = self.items.return_item(page_content['itemHomeAbove'])()
-        iconHome = Icons.GetIcon(page_content.get('iconHome', 'home'))
-        colorHome = Colors.GetColor(page_content.get('colorHome', 'home'))
+        textHomeBelow = self._get_value(page_content['itemHomeBelow'])
+        textHomeAbove = self._get_value(page_content['itemHomeAbove'])
+        iconHome = Icons.GetIcon(page_content['iconHome'])
+        colorHome = Colors.GetColor(page_content['colorHome'])
 
         # Generata PageDate according to: entityUpd~PowerTest~x~navUp~A~65535~~~delete~~~~~~text~sensor.power_consumption~B~17299~Power consumption~100W~1~text~sensor.power_consumption~C~17299~Power consumption~100W~1~text~sensor.today_energy~D~17299~Total energy 1~5836.0kWh~0~delete~~~~~~0~text~sensor.today_energy~E~17299~Total energy 1~5836.0kWh~-30~delete~~~~~~0~text~sensor.today_energy~F~65504~Total energy 1~5836.0kWh~90~text~sensor.today_energy~G~17299~Total energy 1~5836.0kWh~10
         pageData = (
@@ -1883,15 +2869,13 @@ class NSPanel(MqttPlugin):
             f"-~"  # ignored
         )
 
-        for idx, entity in enumerate(page_content['entities']):
+        for entity in page_content['entities']:
             self.logger.debug(f"entity={entity}")
-            if idx > maxItems:
-                break
 
             item = entity.get('item', '')
             value = ''
             if item != '':
-                value = self.items.return_item(item)()
+                value = self._get_formatted_value(item)
 
             name = entity.get('displayNameEntity', '')
 
@@ -1920,94 +2904,174 @@ class NSPanel(MqttPlugin):
         out_msgs = list()
         out_msgs.append(f"pageType~{page_content['pageType']}")
 
-        series_list = list(self.items.return_item(page_content['item'])())
+        series_list = self._get_chart_series(page_content)
 
         maxElements = 88
+        minElements = 12
         nr_of_xAxis_labels = 6
-        nr_of_elements = len(series_list)
 
-        if nr_of_elements > maxElements:
-            self.logger.warning(
-                f"Item contains too many list elements. Max allowed number of list elements for page={page_content['pageType']} is {maxElements}")
-            del series_list[maxElements:]
-            nr_of_elements = maxElements
+        # lower the resolution until the frame fits into the budget of the panel
+        while True:
+            frame = self._build_chart_frame(page, page_content, series_list, maxElements, nr_of_xAxis_labels)
+            if maxElements <= minElements or nspanel_frame.frame_size(frame) <= nspanel_frame.frame_budget(frame):
+                break
+            maxElements = max(minElements, maxElements * 3 // 4)
+            self.frame_stats['chart_reduced'] += 1
+            self.logger.info(f"GenerateChartPage: chart of page={page} too large, reducing to {maxElements} points")
 
-        stepwidth_xAxis = round(nr_of_elements / (nr_of_xAxis_labels - 1))
+        out_msgs.append(frame)
 
-        heading = page_content.get('heading', 'Chart')
-        color = Colors.GetColor(page_content.get('Color', self.defaultColor))
-        yAxisLabel = page_content.get('yAxisLabel', '')
-        yAxisTick = '5:10'
+        return out_msgs
+
+    def _build_chart_frame(self, page, page_content, series_list: list, maxElements: int, nr_of_xAxis_labels: int) -> str:
+        """
+        Build the entityUpd frame of a chart page with at most maxElements points
+        """
+
+        # reduce series to maxElements representative points across the whole time window
+        timestamps, values = nspanel_chart.combine_series(series_list, maxElements, page_content['seriesMode'],
+                                                          page_content['downsampling'])
+        nr_of_elements = len(values)
+
+        heading = page_content['heading']
+        color = Colors.GetColor(page_content['Color'] or self.defaultColor)
+        yAxisLabel = page_content['yAxisLabel']
+
+        # Check if list is empty
+        if not values:
+            yAxisTick = '5:10'
+        else:
+            ticks, step, decimals = nspanel_chart.nice_ticks(min(min(values), 0), max(values), nr_of_xAxis_labels)
+            # display expects non-negative integers, so values and tick positions are sent relative to
+            # the lowest tick (baseline for negative data) in the smallest tick unit, labeled with the real values
+            factor = 10 ** decimals
+            baseline = ticks[0]
+            yAxisTick = ':'.join(nspanel_chart.tick_labels(ticks[1:], baseline, factor, decimals))
 
         # Generata PageDate according to: entityUpd~heading~navigation~color~yAxisLabel~yAxisTick:[yAxisTick]*[~value[:xAxisLabel]?]*
-        pageData = (
+        pageData = [
             f"entityUpd~"
             f"{heading}~"
             f"{self.GetNavigationString(page)}~"
             f"{color}~"
             f"{yAxisLabel}~"
             f"{yAxisTick}"
-        )
-
-        # Check if list is empty
-        if series_list:
-            max_value = max(map(lambda x: x[1], series_list))
+        ]
 
-            for idx, element in enumerate(series_list):
-                value = element[1]
-                if value < 0:
-                    self.logger.warning(f"page={page_content['pageType']} does actually not support negativ values")
-                value = round(value / max_value * 10)
+        if values:
+            stepwidth_xAxis = max(1, round(nr_of_elements / (nr_of_xAxis_labels - 1)))
+            scaled_values = nspanel_chart.scale_series(values, baseline, factor)
 
+            for idx, value in enumerate(scaled_values):
                 xAxisLabel = ""
                 if idx % stepwidth_xAxis == 0 or idx == (nr_of_elements - 1):
-                    timestamp = int(element[0] / 1000)
-                    date_time = datetime.fromtimestamp(timestamp)
+                    date_time = datetime.fromtimestamp(int(timestamps[idx] / 1000))
                     xAxisLabel = "^" + date_time.strftime("%H:%M")
-                pageData = f"{pageData}~{value}{xAxisLabel}"
+                pageData.append(f"{value}{xAxisLabel}")
 
-        out_msgs.append(pageData)
+        return '~'.join(pageData)
 
-        return out_msgs
+    def _get_chart_series(self, page_content) -> list:
+        """
+        Return the list of series of a chart page, either directly from 'item' or aggregated by
+        the database plugin from 'source_item'. Both can be a single item or a list of items.
+        """
+        if 'source_item' in page_content:
+            paths = page_content['source_item']
+        else:
+            paths = page_content['item']
+        if not isinstance(paths, list):
+            paths = [paths]
+
+        series_list = []
+        for path in paths:
+            if 'source_item' in page_content:
+                series = self._get_database_series(path, page_content)
+            else:
+                series = self._get_value(path)
+            series_list.append(series or [])
+        return series_list
+
+    def _get_database_series(self, path: str, page_content) -> list:
+        """
+        Return the series of an item aggregated by the database plugin using
+        'aggregation', 'window' and 'bucket' of the chart page
+        """
+        item = self._return_item(path)
+        if item is None or not hasattr(item, 'series'):
+            self.logger.error(f"{path} is not a valid item with database attribute")
+            return []
+
+        aggregation = page_content['aggregation']
+        window = nspanel_chart.duration_to_seconds(page_content['window'])
+        bucket = max(60, nspanel_chart.duration_to_seconds(page_content['bucket']))
+        ttl = nspanel_chart.duration_to_seconds(page_content.get('cache_ttl', bucket))
+        key = (item.property.path, aggregation, window, bucket)
+        now = time.time()
+
+        self.series_cache.evict_expired(now)
+        entry = self.series_cache.get(key, now, window)
+        if entry is not None and entry['expires'] > now:
+            return entry['series']
+
+        if entry is None or now - entry['fetched'] + bucket >= window:
+            series = self._query_database_series(item, aggregation, window, bucket)
+        else:
+            # only the newest buckets need to be fetched, the last cached bucket was incomplete
+            refresh = (math.ceil((now - entry['fetched']) / bucket) + 1) * bucket
+            newest = self._query_database_series(item, aggregation, refresh, bucket)
+            if newest is None:
+                series = None
+            else:
+                first_new = newest[0][0] if newest else now * 1000
+                oldest = (now - window) * 1000
+                series = [point for point in entry['series'] if oldest <= point[0] < first_new] + newest
+
+        if series is None:
+            return entry['series'] if entry is not None else []
+
+        self.series_cache.put(key, series, now, ttl, window)
+        return series
+
+    def _query_database_series(self, item, aggregation: str, window: int, bucket: int):
+        """
+        Query an aggregated series for the last window seconds from the database plugin
+        """
+        self.logger.debug(f"_query_database_series: item={item.property.path}, aggregation={aggregation}, window={window}, bucket={bucket}")
+        try:
+            # database plugin uses 'i' as unit for minutes
+            result = item.series(aggregation, f"{max(1, window // 60)}i", 'now', count=max(1, window // bucket))
+        except Exception as e:
+            self.logger.warning(f"Query of database series for {item.property.path} failed: {e}")
+            return None
+        return list(result.get('series') or [])
 
     def GeneratePageElements(self, page) -> str:
         self.logger.debug(f"GeneratePageElements called with page={page}")
 
         page_content = self.panel_config[page]
 
-        if page_content['pageType'] in ['cardThermo', 'cardAlarm', 'cardMedia', 'cardQR', 'cardPower', 'cardChart']:
-            maxItems = 1
-        elif page_content['pageType'] == 'cardEntities':
-            maxItems = 6 if self.panel_model == 'us-p' else 4
-        elif page_content['pageType'] == 'cardGrid':
-            maxItems = 6
-        else:
-            maxItems = 1
-
-        if len(page_content['entities']) > maxItems:
-            self.logger.warning(
-                f"Page definition contains too many Entities. Max allowed entities for page={page_content['pageType']} is {maxItems}")
-
+        # number of entities is limited during validation of the config
         pageData = (
             f"entityUpd~"
             f"{page_content['heading']}~"
             f"{self.GetNavigationString(page)}"
         )
 
-        for idx, entity in enumerate(page_content['entities']):
+        for entity in page_content['entities']:
             self.logger.debug(f"entity={entity}")
-            if idx > maxItems:
-                break
 
-            item = self.items.return_item(entity.get('item', None))
-            value = item() if item else entity.get('optionalValue', 0)
+            item = self._return_item(entity.get('item', None))
+            value = self._item_value(item) if item else entity.get('optionalValue', 0)
+            if item and entity['type'] == 'text':
+                value = self.value_formats.format(item.property.path, value)
             if entity['type'] in ['switch', 'light']:
                 value = int(value)
 
             iconName = entity.get('iconId', '')
-            status = self.items.return_item(entity.get('item_status', None))
+            status = self._return_item(entity.get('item_status', None))
             inactive = False
-            if (status is not None) and not status():
+            if (status is not None) and not self._item_value(status):
                 inactive = True
 
             iconid = Icons.GetIcon(iconName, inactive)
@@ -2048,37 +3112,37 @@ class NSPanel(MqttPlugin):
         entity = self.getEntityByName(pagename)
         icon_color = Colors.GetColor(self.defaultColor)
         # switch
-        item = self.items.return_item(entity.get('item', ''))
+        item = self._return_item(entity.get('item', ''))
         if item is None:
             switch_val = 0
         else:
-            switch_val = 1 if item() else 0
+            switch_val = 1 if self._item_value(item) else 0
         # brightness
-        item_brightness = self.items.return_item(entity.get('item_brightness', None))
+        item_brightness = self._return_item(entity.get('item_brightness', None))
         if item_brightness is None:
             brightness = "disable"
         else:
-            brightness = scale(item_brightness(),
+            brightness = scale(self._item_value(item_brightness),
                                (entity.get('min_brightness', "0"), entity.get('max_brightness', "100")), (0, 100))
         # temperature
-        item_temperature = self.items.return_item(entity.get('item_temperature', None))
+        item_temperature = self._return_item(entity.get('item_temperature', None))
         if item_temperature is None:
             temperature = "disable"
         else:
-            temperature = scale(item_temperature(),
+            temperature = scale(self._item_value(item_temperature),
                                 (entity.get('min_temperature', "0"), entity.get('max_temperature', "100")), (100, 0))
         # color
-        item_color = self.items.return_item(entity.get('item_color', None))
+        item_color = self._return_item(entity.get('item_color', None))
         if item_color is None:
             color = "disable"
         else:
             color = 0
         # effect?
         effect_supported = entity.get('effect_supported', "disable")
-        # labels TODO translate
-        color_translation = "Farbe"
-        brightness_translation = "Helligkeit"
-        color_temp_translation = "Farbtemperatur"
+        # labels
+        color_translation = self._get_locale('lights', 'Color')
+        brightness_translation = self._get_locale('lights', 'Brightness')
+        color_temp_translation = self._get_locale('lights', 'Temperature')
 
         out_msgs = list()
         out_msgs.append(
@@ -2090,11 +3154,11 @@ class NSPanel(MqttPlugin):
         entity = self.getEntityByName(pagename)
         # iconId = entity.get('iconId', '') # not used
         itemname_pos = entity.get('item_pos', None)
-        item_pos = self.items.return_item(itemname_pos)
+        item_pos = self._return_item(itemname_pos)
         if item_pos is not None:
-            sliderPos = scale(item_pos(),
+            sliderPos = scale(self._item_value(item_pos),
                               (entity.get('min_pos', 0), entity.get('max_pos', 100)), (0, 100))
-            textPosition = entity.get('textPosition', 'Position')
+            textPosition = entity.get('textPosition', self._get_locale('blinds', 'Position'))
         else:
             sliderPos = 'disable'
             textPosition = ''
@@ -2113,10 +3177,10 @@ class NSPanel(MqttPlugin):
         iconTiltStopStatus = 12
         iconTiltRightStatus = 13
         itemname_tilt = entity.get('item_tilt', None)
-        item_tilt = self.items.return_item(itemname_tilt)
+        item_tilt = self._return_item(itemname_tilt)
         if item_tilt is not None:
-            textTilt = entity.get('textTilt', 'Lamellen')
-            tiltPos = scale(item_tilt(),
+            textTilt = entity.get('textTilt', self._get_locale('blinds', 'Tilt'))
+            tiltPos = scale(self._item_value(item_tilt),
                             (entity.get('min_tilt', 0), entity.get('max_tilt', 100)), (0, 100))
         else:
             textTilt = ''
@@ -2145,9 +3209,9 @@ class NSPanel(MqttPlugin):
         modeType = ''  # not used
         state = ''
         itemName = entity.get('item', None)
-        item = self.items.return_item(itemName)
+        item = self._return_item(itemName)
         if item is not None:
-            state = item()
+            state = self._item_value(item)
             if state == '':
                 state = 'empty'
             self.logger.debug(f"item={item} itemValue={state}")
@@ -2168,12 +3232,12 @@ class NSPanel(MqttPlugin):
         buttonleft = entity.get('buttonleft', '')  # pause
         buttoncenter = entity.get('buttoncenter', '')  # cancel
         buttonright = entity.get('buttonright', '')  # finish
-        item = self.items.return_item(entity.get('item', None))
+        item = self._return_item(entity.get('item', None))
         value = 0
         if item is not None:
-            value = item()
+            value = self._item_value(item)
 
-        seconds = item() % 60
+        seconds = self._item_value(item) % 60
         minutes = int((value - seconds) / 60)
         out_msgs = list()
         # first entity is used to identify the correct page, the second is used for the button event
@@ -2184,11 +3248,11 @@ class NSPanel(MqttPlugin):
     def GenerateDetailFan(self, pagename) -> list:
         self.logger.debug(f"GenerateDetailFan called with entity={pagename}")
         entity = self.getEntityByName(pagename)
-        item = self.items.return_item(entity.get('item', None))
-        switch_val = 1 if item() else 0
+        item = self._return_item(entity.get('item', None))
+        switch_val = 1 if self._item_value(item) else 0
         icon_color = entity.get('color', 65535)
-        item_speed = self.items.return_item(entity.get('item_speed', None))
-        speed = item_speed()
+        item_speed = self._return_item(entity.get('item_speed', None))
+        speed = self._item_value(item_speed)
         percentage_step = entity.get("percentage_step", 25)
         speedMax = 100
         if percentage_step is None:
@@ -2199,10 +3263,10 @@ class NSPanel(MqttPlugin):
             speed = round(speed / percentage_step)
             speedMax = int(100 / percentage_step)
 
-        speed_translation = "Geschwindigkeit"
+        speed_translation = self._get_locale('fan', 'Speed')
 
-        item_preset = self.items.return_item(entity.get('item_preset', None))
-        preset_mode = item_preset()
+        item_preset = self._return_item(entity.get('item_preset', None))
+        preset_mode = self._item_value(item_preset)
         preset_modes = entity.get("preset_modes", [])
         if preset_modes is not None:
             preset_modes = "?".join(preset_modes)
@@ -2217,19 +3281,39 @@ class NSPanel(MqttPlugin):
     def SendToPanel(self, payload):
         self.logger.debug(f"SendToPanel called with payload={payload}")
 
-        if self.lastPayload == payload:
-            self.logger.error("SendToPanel: duplicate payload no transfer")
-        else:
-            if isinstance(payload, list):
-                for idx, entry in enumerate(payload):
-                    if idx >= len(self.lastPayload) or self.lastPayload[idx] != payload[idx]:
-                        self.publish_tasmota_topic(payload=entry)
-                    else:
-                        self.logger.debug("SendToPanel: identical element in payload")
-                self.lastPayload = payload
+        if not self.panel_status['online']:
+            self.frame_stats['suppressed'] += 1
+            self.logger.debug("SendToPanel: panel is offline, payload not sent")
+            return
+
+        for frame in payload if isinstance(payload, list) else [payload]:
+            if self.frame_cache.unchanged(frame):
+                self.frame_stats['unchanged'] += 1
+                self.logger.debug(f"SendToPanel: {nspanel_frame.frame_type(frame)} frame unchanged, not sent")
             else:
-                self.lastPayload = [payload]
-                self.publish_tasmota_topic(payload=payload)
+                self.frame_cache.sent(frame)
+                self._publish_frame(frame)
+
+    def _publish_frame(self, frame: str) -> None:
+        """
+        Publish a frame to the panel within the byte budget of its message type. Text fields of too
+        long frames are truncated, frames still exceeding the budget are dropped and counted.
+        """
+
+        budget = nspanel_frame.frame_budget(frame)
+        frame, truncated = nspanel_frame.fit_frame(frame, budget, self.frame_protected, self.frame_cache.page_type())
+        size = nspanel_frame.frame_size(frame)
+        if size > budget:
+            self.frame_stats['dropped'] += 1
+            self.frame_stats['last_dropped'] = f"{nspanel_frame.frame_type(frame)}: {size} bytes"
+            self.logger.warning(f"_publish_frame: {nspanel_frame.frame_type(frame)} frame with {size} bytes exceeds budget of {budget} bytes and is not sent")
+            return
+        if truncated:
+            self.frame_stats['truncated'] += 1
+            self.logger.info(f"_publish_frame: text of {nspanel_frame.frame_type(frame)} frame truncated to {size} bytes")
+        self.frame_stats['sent'] += 1
+        self.frame_stats['max_size'] = max(self.frame_stats['max_size'], size)
+        self.publish_tasmota_topic(payload=frame)
 
     def GetNavigationString(self, page) -> str:
         """
@@ -2245,25 +3329,23 @@ class NSPanel(MqttPlugin):
         # 2 | 0 = (right) up navigation arrow
         # 2 | 2 = (right) up navigation arrow | (left) home navigation icon
 
-        # ToDo: Handling of SubPages
-        # if (activePage.subPage):
-        #     return '2|2'
-
         iconleft = Icons.GetIcon('arrow-left-bold')
         iconright = Icons.GetIcon('arrow-right-bold')
         iconup = Icons.GetIcon('arrow-up-bold')
         iconhome = Icons.GetIcon('home')
         iconreload = Icons.GetIcon('reload')
 
+        position = self.main_position.get(page)
         if page == 0:
             left = f"bHome~{iconreload}"
             right = f"bNext~{iconright}"
-        elif page == self.no_of_cards - 1:
-            left = f"bPrev~{iconleft}"
-            right = f"bHome~{iconhome}"
-        elif page == -1 or page == -2:
+        elif page == -1 or page == -2 or position is None or self.page_stack:
+            # subpage
             left = f"bUp~{iconup}"
             right = f"bHome~{iconhome}"
+        elif position == len(self.main_pages) - 1:
+            left = f"bPrev~{iconleft}"
+            right = f"bHome~{iconhome}"
         else:
             left = f"bPrev~{iconleft}"
             right = f"bNext~{iconright}"
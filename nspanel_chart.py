@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2022-      Michael Wenzel            wenzel_michael(a)web.de
+#                       Stefan Hauf               stefan.hauf(a)gmail.com
+#                       Christian Cordes          info(a)pol3cat.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Helper functions to prepare item series for cardChart / cardLChart
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import math
+
+DOWNSAMPLING_MODES = ['lttb', 'minmax', 'average']
+# the display draws one series: 'overlay' draws the upper envelope (max per point) of all series,
+# 'stacked' their sum
+SERIES_MODES = ['overlay', 'stacked']
+
+
+def split_series(series):
+    """
+    Split a series of [timestamp, value] pairs into two lists, skipping
+    entries without a value (database plugin returns None for empty buckets)
+    """
+    xs = [p[0] for p in series if p[1] is not None]
+    ys = [p[1] for p in series if p[1] is not None]
+    return xs, ys
+
+
+def downsample(series, threshold: int, mode: str = 'lttb') -> tuple:
+    """
+    Reduce a series of [timestamp, value] pairs to at most threshold points
+    covering the whole time window.
+
+    :param series:      list of [timestamp, value] pairs, sorted by timestamp
+    :param threshold:   max number of points to return
+    :param mode:        one of DOWNSAMPLING_MODES
+    :return:            tuple of (timestamps, values)
+    """
+    xs, ys = split_series(series)
+    if len(xs) <= threshold or threshold < 3:
+        return xs, ys
+
+    if mode == 'minmax':
+        return _downsample_minmax(xs, ys, threshold)
+    if mode == 'average':
+        return _downsample_average(xs, ys, threshold)
+    return _downsample_lttb(xs, ys, threshold)
+
+
+def combine_series(series_list: list, threshold: int, mode: str = 'overlay', downsampling: str = 'lttb') -> tuple:
+    """
+    Downsample several series and combine them into the one series the display can draw.
+    A single series is downsampled as is. Multiple series are averaged onto a common time
+    grid of threshold buckets and either summed up ('stacked') or merged into their upper
+    envelope ('overlay', the max of all series per point, the single series are not drawn).
+
+    :return:            tuple of (timestamps, values)
+    """
+    if len(series_list) == 1:
+        return downsample(series_list[0], threshold, downsampling)
+
+    split = [split_series(series) for series in series_list]
+    split = [(xs, ys) for xs, ys in split if xs]
+    if not split:
+        return [], []
+
+    start = min(xs[0] for xs, _ in split)
+    end = max(xs[-1] for xs, _ in split)
+    buckets = threshold if end > start else 1
+    grids = [_resample(xs, ys, start, end, buckets) for xs, ys in split]
+
+    width = (end - start) / buckets
+    timestamps = [start + width * (i + 0.5) for i in range(buckets)]
+    if mode == 'stacked':
+        values = [sum(column) for column in zip(*grids)]
+    else:
+        values = [max(column) for column in zip(*grids)]
+    return timestamps, values
+
+
+def _resample(xs: list, ys: list, start: float, end: float, buckets: int) -> list:
+    """
+    Average the series onto buckets equally distributed between start and end.
+    Empty buckets repeat the previous value (or the first available one).
+    """
+    sums = [0.0] * buckets
+    counts = [0] * buckets
+    factor = buckets / (end - start) if end > start else 0
+    last = buckets - 1
+    for x, y in zip(xs, ys):
+        idx = min(int((x - start) * factor), last)
+        sums[idx] += y
+        counts[idx] += 1
+
+    grid = [s / c if c else None for s, c in zip(sums, counts)]
+    previous = next(value for value in grid if value is not None)
+    for idx, value in enumerate(grid):
+        if value is None:
+            grid[idx] = previous
+        else:
+            previous = value
+    return grid
+
+
+def tick_labels(ticks: list, baseline: float, factor: int, decimals: int) -> list:
+    """
+    Return the yAxisTick entries for ticks. The position of a tick is relative to the baseline like
+    the values, for a baseline other than 0 (negative data) the tick is labeled with its real value.
+    """
+    positions = scale_series(ticks, baseline, factor)
+    if not baseline:
+        return [str(position) for position in positions]
+    return [f"{position}^{tick:.{decimals}f}" for position, tick in zip(positions, ticks)]
+
+
+def scale_series(values: list, baseline: float, factor: int) -> list:
+    """
+    Shift values by baseline (lowest tick) and scale them to integers in the smallest tick unit,
+    because the display only draws non-negative integers
+    """
+    return [round((value - baseline) * factor) for value in values]
+
+
+def _bucket_bounds(n: int, buckets: int) -> list:
+    """
+    Return the start indices of buckets equally distributed over n points (plus the end index)
+    """
+    return [(n * i) // buckets for i in range(buckets + 1)]
+
+
+def _downsample_average(xs: list, ys: list, threshold: int) -> tuple:
+    bounds = _bucket_bounds(len(xs), threshold)
+    out_x = []
+    out_y = []
+    for start, end in zip(bounds, bounds[1:]):
+        size = end - start
+        out_x.append(sum(xs[start:end]) / size)
+        out_y.append(sum(ys[start:end]) / size)
+    return out_x, out_y
+
+
+def _downsample_minmax(xs: list, ys: list, threshold: int) -> tuple:
+    bounds = _bucket_bounds(len(xs), threshold // 2)
+    out_x = []
+    out_y = []
+    for start, end in zip(bounds, bounds[1:]):
+        bucket = ys[start:end]
+        i_min = start + bucket.index(min(bucket))
+        i_max = start + bucket.index(max(bucket))
+        # keep chronological order within the bucket
+        for idx in sorted({i_min, i_max}):
+            out_x.append(xs[idx])
+            out_y.append(ys[idx])
+    return out_x, out_y
+
+
+def _downsample_lttb(xs: list, ys: list, threshold: int) -> tuple:
+    """
+    Largest-Triangle-Three-Buckets: keeps first and last point and selects per bucket
+    the point forming the largest triangle with the previously selected point and the
+    average of the next bucket
+    """
+    n = len(xs)
+    # inner buckets, first and last point are always kept
+    bounds = [1 + ((n - 2) * i) // (threshold - 2) for i in range(threshold - 1)]
+
+    out_x = [xs[0]]
+    out_y = [ys[0]]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        if i + 2 < len(bounds):
+            next_start, next_end = bounds[i + 1], bounds[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        size = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / size
+        avg_y = sum(ys[next_start:next_end]) / size
+
+        ax = xs[a]
+        ay = ys[a]
+        dx = avg_x - ax
+        dy = avg_y - ay
+        # doubled triangle area; the constant factor does not change the argmax
+        areas = [abs(dx * (y - ay) - dy * (x - ax)) for x, y in zip(xs[start:end], ys[start:end])]
+        a = start + areas.index(max(areas))
+        out_x.append(xs[a])
+        out_y.append(ys[a])
+
+    out_x.append(xs[-1])
+    out_y.append(ys[-1])
+    return out_x, out_y
+
+
+def _nice_number(value: float, round_result: bool) -> float:
+    """
+    Return a 'nice' number (1, 2, 5 times power of ten) approximately equal to value
+    """
+    exponent = math.floor(math.log10(value))
+    fraction = value / 10 ** exponent
+    if round_result:
+        if fraction < 1.5:
+            nice = 1
+        elif fraction < 3:
+            nice = 2
+        elif fraction < 7:
+            nice = 5
+        else:
+            nice = 10
+    else:
+        if fraction <= 1:
+            nice = 1
+        elif fraction <= 2:
+            nice = 2
+        elif fraction <= 5:
+            nice = 5
+        else:
+            nice = 10
+    return nice * 10 ** exponent
+
+
+def nice_ticks(low: float, high: float, max_ticks: int = 6) -> tuple:
+    """
+    Calculate axis ticks covering the range low..high
+
+    :return:    tuple of (list of ticks starting with the lowest tick, step, decimals)
+    """
+    if high <= low:
+        high = low + 1
+    span = _nice_number(high - low, False)
+    step = _nice_number(span / (max_ticks - 1), True)
+    decimals = max(0, -math.floor(math.log10(step)))
+    first = math.floor(low / step)
+    last = math.ceil(high / step)
+    ticks = [round(i * step, decimals) for i in range(first, last + 1)]
+    return ticks, step, decimals
+
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def duration_to_seconds(duration) -> int:
+    """
+    Convert a duration like '15m', '24h', '7d' or a number of seconds into seconds
+    """
+    if isinstance(duration, (int, float)):
+        return int(duration)
+    duration = str(duration).strip()
+    unit = duration[-1:].lower()
+    if unit in DURATION_UNITS:
+        return int(float(duration[:-1]) * DURATION_UNITS[unit])
+    return int(float(duration))
+
+
+class SeriesCache(object):
+    """
+    Cache of aggregated database series keyed by (item, aggregation, window, bucket).
+    Entries are refreshed after ttl seconds and evicted if not used for a whole window.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, key, now: float, window: int):
+        """
+        Return cache entry for key or None. The entry is returned even if it is stale,
+        so the caller can refresh it incrementally.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry['evict'] = now + window
+        return entry
+
+    def put(self, key, series: list, now: float, ttl: int, window: int) -> dict:
+        entry = {'series': series, 'fetched': now, 'expires': now + ttl, 'evict': now + window}
+        self._entries[key] = entry
+        return entry
+
+    def evict_expired(self, now: float) -> int:
+        expired = [key for key, entry in self._entries.items() if entry['evict'] < now]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
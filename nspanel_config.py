@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2022-      Michael Wenzel            wenzel_michael(a)web.de
+#                       Stefan Hauf               stefan.hauf(a)gmail.com
+#                       Christian Cordes          info(a)pol3cat.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Schema and validation of the page config (nspanel_pages.yaml)
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import hashlib
+import json
+import os
+import pickle
+
+import yaml
+
+from . import nspanel_chart
+from . import nspanel_telemetry
+
+ENTITY_TYPES = ['light', 'switch', 'shutter', 'button', 'number', 'input_sel', 'text', 'delete', 'fan', 'timer',
+                'popupLight', 'popupShutter', 'popupThermo', 'popupInSel', 'popupTimer', 'popupFan']
+
+# per pageType: required keys, optional keys with defaults, allowed entity types and max number of entities
+# max_entities may depend on the model of the panel
+PAGE_SCHEMA = {
+    'screensaver': {
+        'required': [],
+        'optional': {'timeout': 10, 'brightness': 10, 'timeFormat': '%H:%M', 'dateFormat': '%A, %-d. %B %Y',
+                     'doubleTapToUnlock': False, 'alternativeLayout': False, 'statusIconBig': True,
+                     'statusIconLeft': None, 'statusIconRight': None, 'itemSecondLine': None, 'entities': []},
+        'entity_types': None,
+        'max_entities': 5,
+    },
+    'screensaver2': {
+        'required': [],
+        'optional': {'timeout': 10, 'brightness': 10, 'timeFormat': '%H:%M', 'dateFormat': '%A, %-d. %B %Y',
+                     'doubleTapToUnlock': False, 'alternativeLayout': False, 'statusIconBig': True,
+                     'statusIconLeft': None, 'statusIconRight': None, 'itemSecondLine': None, 'entities': []},
+        'entity_types': None,
+        'max_entities': 15,
+    },
+    'cardEntities': {
+        'required': ['heading', 'entities'],
+        'optional': {},
+        'entity_types': ENTITY_TYPES,
+        'max_entities': {'eu': 4, 'us-l': 4, 'us-p': 6},
+    },
+    'cardGrid': {
+        'required': ['heading', 'entities'],
+        'optional': {},
+        'entity_types': ENTITY_TYPES,
+        'max_entities': 6,
+    },
+    'cardThermo': {
+        'required': ['entity', 'heading', 'item_temp_current', 'item_temp_set'],
+        'optional': {'item_mode': None, 'minSetValue': 5, 'maxSetValue': 30, 'stepSetValue': 0.5,
+                     'popupThermoMode1': False, 'precision': None, 'decimalSeparator': None},
+        'entity_types': None,
+        'max_entities': 0,
+    },
+    'cardMedia': {
+        'required': ['entity', 'heading'],
+        'optional': {'item_title': None, 'item_author': None, 'item_volume': None, 'item_play': None,
+                     'item_pause': None, 'item_next': None, 'item_back': None, 'item_shuffle': None,
+                     'item_OnOff': None, 'titleColor': 65535, 'authorColor': 65535, 'onOffBtn': '',
+                     'iconShuffle': None, 'entities': []},
+        'entity_types': ['preset', 'input_sel', 'delete'],
+        'max_entities': 6,
+    },
+    'cardAlarm': {
+        'required': ['entity'],
+        'optional': {'title': '', 'icon': 'home', 'color': 'White', 'icon2': '', 'icon2Color': None,
+                     'icon2OnColor': None, 'icon2OffColor': None, 'item_icon2': '', 'entities': []},
+        'entity_types': None,
+        'max_entities': 4,
+    },
+    'cardUnlock': {
+        'required': ['entity'],
+        'optional': {'title': '', 'icon': 'home', 'color': 'White', 'icon2': '', 'icon2Color': None,
+                     'icon2OnColor': None, 'icon2OffColor': None, 'item_icon2': '', 'entities': []},
+        'entity_types': None,
+        'max_entities': 4,
+    },
+    'cardQR': {
+        'required': ['entity', 'heading', 'item_SSID', 'item_Password'],
+        'optional': {'hidePassword': False, 'iconColor': 'White'},
+        'entity_types': None,
+        'max_entities': 0,
+    },
+    'cardPower': {
+        'required': ['entity', 'heading', 'itemHomeBelow', 'itemHomeAbove', 'entities'],
+        'optional': {'iconHome': 'home', 'colorHome': 'home'},
+        'entity_types': None,
+        'max_entities': 6,
+    },
+    'cardChart': {
+        'required': ['entity'],
+        'optional': {'heading': 'Chart', 'Color': None, 'yAxisLabel': '', 'downsampling': 'lttb',
+                     'seriesMode': 'overlay', 'aggregation': 'avg', 'window': '24h', 'bucket': '15m'},
+        'entity_types': None,
+        'max_entities': 0,
+    },
+    'cardLChart': {
+        'required': ['entity'],
+        'optional': {'heading': 'Chart', 'Color': None, 'yAxisLabel': '', 'downsampling': 'lttb',
+                     'seriesMode': 'overlay', 'aggregation': 'avg', 'window': '24h', 'bucket': '15m'},
+        'entity_types': None,
+        'max_entities': 0,
+    },
+}
+
+
+# C implementation of the yaml loader, if libyaml is available
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# hardware buttons: press types and actions with their required keys
+BUTTON_PRESS_TYPES = ['press', 'double', 'long']
+BUTTON_ACTIONS = {'toggle': ['item'], 'scene': ['item', 'value'], 'page': ['page']}
+
+# telemetry values of the panel (nspanel_attr) filtered before they are written to items
+TELEMETRY_VALUES = list(nspanel_telemetry.DEFAULT_FILTERS)
+
+
+def _report(report: list, level: str, page: int, entity, message: str) -> None:
+    report.append({'level': level, 'page': page, 'entity': entity, 'message': message})
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_panel_config(config, model: str = 'eu') -> tuple:
+    """
+    Validate the page config against PAGE_SCHEMA and complete optional keys with their defaults,
+    so pages can be rendered without further checks
+
+    :param config:      page config as loaded from yaml
+    :param model:       model of the panel (eu, us-l, us-p)
+    :return:            tuple of (config, report). The report is a list of dicts with the keys
+                        level ('error' or 'warning'), page, entity and message
+    """
+    report = []
+    if not isinstance(config, list) or not config:
+        _report(report, 'error', None, None, "page config must be a non empty list of pages")
+        return config, report
+
+    for idx, card in enumerate(config):
+        if not isinstance(card, dict):
+            _report(report, 'error', idx, None, "page definition must be a dict")
+            continue
+
+        page_type = card.get('pageType')
+        if idx == 0 and page_type is None:
+            page_type = card['pageType'] = 'screensaver'
+        schema = PAGE_SCHEMA.get(page_type)
+        if schema is None:
+            _report(report, 'error', idx, card.get('entity'), f"unknown pageType '{page_type}'")
+            continue
+        if (idx == 0) != page_type.startswith('screensaver'):
+            _report(report, 'error', idx, card.get('entity'), "first page must be the screensaver and only the first")
+
+        for key in schema['required']:
+            if card.get(key) is None:
+                _report(report, 'error', idx, card.get('entity'), f"required key '{key}' missing for pageType '{page_type}'")
+        for key, default in schema['optional'].items():
+            if key not in card or (card[key] is None and default is not None):
+                card[key] = default if not isinstance(default, list) else []
+        _validate_format(card, idx, card.get('entity'), report)
+
+        if page_type in ('cardChart', 'cardLChart'):
+            _validate_chart(card, idx, report)
+
+        # child pages, reached by navigate.<entity> and left by bUp
+        sub_pages = card.setdefault('subPages', [])
+        if not isinstance(sub_pages, list):
+            _report(report, 'error', idx, card.get('entity'), "subPages must be a list of page entities")
+            card['subPages'] = []
+
+        entities = card.get('entities')
+        if entities is None:
+            continue
+        if not isinstance(entities, list):
+            _report(report, 'error', idx, card.get('entity'), "entities must be a list")
+            continue
+
+        max_entities = schema['max_entities']
+        if isinstance(max_entities, dict):
+            max_entities = max_entities.get(model, min(max_entities.values()))
+        if len(entities) > max_entities:
+            _report(report, 'warning', idx, card.get('entity'),
+                    f"too many entities ({len(entities)}), max allowed for pageType '{page_type}' is {max_entities}")
+            del entities[max_entities:]
+
+        for entity in entities:
+            if not isinstance(entity, dict):
+                _report(report, 'error', idx, card.get('entity'), f"entity {entity} must be a dict")
+                continue
+            _validate_format(entity, idx, entity.get('entity'), report)
+            if schema['entity_types'] is None:
+                continue
+            name = entity.get('entity')
+            if name is None:
+                _report(report, 'error', idx, None, "entity without key 'entity'")
+            if 'type' not in entity:
+                _report(report, 'warning', idx, name, "entity without key 'type' is not displayed")
+            entity_type = entity.setdefault('type', 'delete')
+            if entity_type not in schema['entity_types']:
+                _report(report, 'error', idx, name, f"entity type '{entity_type}' not allowed for pageType '{page_type}'")
+
+    _validate_sub_pages(config, report)
+    return config, report
+
+
+def _validate_sub_pages(config: list, report: list) -> None:
+    names = {card.get('entity') for card in config if isinstance(card, dict)}
+    for idx, card in enumerate(config):
+        if not isinstance(card, dict):
+            continue
+        for name in card.get('subPages', []):
+            if name not in names:
+                _report(report, 'error', idx, card.get('entity'), f"subPage '{name}' is not defined")
+            elif name == card.get('entity'):
+                _report(report, 'error', idx, name, "page can not be its own subPage")
+
+
+def build_navigation(config: list) -> tuple:
+    """
+    Precompute the navigation of the page config
+
+    :return:    tuple of (dict of page entity to page index, list of main page indices in order of
+                bNext / bPrev, dict of main page index to its position within the main pages)
+    """
+    # pages not being a dict are reported by validate_panel_config
+    cards = [(idx, card) for idx, card in enumerate(config) if isinstance(card, dict)]
+    page_index = {}
+    for idx, card in cards:
+        name = card.get('entity')
+        if isinstance(name, str) and name not in page_index:
+            page_index[name] = idx
+
+    sub_pages = {page_index[name] for idx, card in cards
+                 for name in (card.get('subPages') if isinstance(card.get('subPages'), list) else [])
+                 if isinstance(name, str) and name in page_index}
+    main_pages = [idx for idx in range(1, len(config)) if idx not in sub_pages]
+    main_position = {page: pos for pos, page in enumerate(main_pages)}
+    return page_index, main_pages, main_position
+
+
+def _validate_chart(card: dict, idx: int, report: list) -> None:
+    if card.get('item') is None and card.get('source_item') is None:
+        _report(report, 'error', idx, card.get('entity'), "chart page needs 'item' or 'source_item'")
+    if card['downsampling'] not in nspanel_chart.DOWNSAMPLING_MODES:
+        _report(report, 'warning', idx, card.get('entity'), f"unknown downsampling mode '{card['downsampling']}', using 'lttb'")
+        card['downsampling'] = 'lttb'
+    if card['seriesMode'] not in nspanel_chart.SERIES_MODES:
+        _report(report, 'warning', idx, card.get('entity'), f"unknown seriesMode '{card['seriesMode']}', using 'overlay'")
+        card['seriesMode'] = 'overlay'
+
+
+def _validate_format(config: dict, idx: int, name, report: list) -> None:
+    precision = config.get('precision')
+    if precision is not None and (not isinstance(precision, int) or isinstance(precision, bool) or precision < 0):
+        _report(report, 'warning', idx, name, f"precision '{precision}' must be a non negative integer, value is not rounded")
+        config['precision'] = None
+    separator = config.get('decimalSeparator')
+    if separator is not None and separator not in ('.', ','):
+        _report(report, 'warning', idx, name, f"unknown decimalSeparator '{separator}', using the one of the language")
+        config['decimalSeparator'] = None
+
+
+def validate_button_config(name: str, config) -> tuple:
+    """
+    Validate the mapping of a hardware button (plugin parameter button1 / button2)
+
+    :param name:        name of the button
+    :param config:      dict of press type to action
+    :return:            tuple of (valid mapping, report)
+    """
+    report = []
+    mapping = {}
+    if not config:
+        return mapping, report
+    if not isinstance(config, dict):
+        _report(report, 'error', None, name, "button config must be a dict")
+        return mapping, report
+
+    for press, action in config.items():
+        if press not in BUTTON_PRESS_TYPES:
+            _report(report, 'error', None, name, f"unknown press type '{press}', allowed are {BUTTON_PRESS_TYPES}")
+            continue
+        if not isinstance(action, dict) or action.get('action') not in BUTTON_ACTIONS:
+            _report(report, 'error', None, name, f"action of '{press}' must be a dict with action one of {list(BUTTON_ACTIONS)}")
+            continue
+        missing = [key for key in BUTTON_ACTIONS[action['action']] if action.get(key) is None]
+        if missing:
+            _report(report, 'error', None, name, f"action '{action['action']}' of '{press}' needs {missing}")
+            continue
+        mapping[press] = action
+    return mapping, report
+
+
+def validate_telemetry_config(config) -> tuple:
+    """
+    Validate the filter of the panel telemetry (plugin parameter telemetry_filter)
+
+    :param config:      dict of telemetry value (nspanel_attr) to filter settings
+    :return:            tuple of (valid filter config, report)
+    """
+    report = []
+    filters = {}
+    if not config:
+        return filters, report
+    if not isinstance(config, dict):
+        _report(report, 'error', None, 'telemetry_filter', "telemetry filter config must be a dict")
+        return filters, report
+
+    for key, settings in config.items():
+        if key not in TELEMETRY_VALUES:
+            _report(report, 'error', None, 'telemetry_filter', f"unknown telemetry value '{key}', allowed are {TELEMETRY_VALUES}")
+            continue
+        if not isinstance(settings, dict):
+            _report(report, 'error', None, 'telemetry_filter', f"filter of '{key}' must be a dict")
+            continue
+        valid = {}
+        for setting, value in settings.items():
+            if setting == 'smoothing':
+                if value not in nspanel_telemetry.SMOOTHING:
+                    _report(report, 'error', None, 'telemetry_filter', f"smoothing of '{key}' must be one of {nspanel_telemetry.SMOOTHING}")
+                    continue
+            elif setting in ('deadband', 'min_interval'):
+                if not _is_number(value) or value < 0:
+                    _report(report, 'error', None, 'telemetry_filter', f"{setting} of '{key}' must be a number >= 0")
+                    continue
+            elif setting == 'alpha':
+                if not _is_number(value) or not 0 < value <= 1:
+                    _report(report, 'error', None, 'telemetry_filter', f"alpha of '{key}' must be a number > 0 and <= 1")
+                    continue
+            elif setting == 'window':
+                if not isinstance(value, int) or value < 1:
+                    _report(report, 'error', None, 'telemetry_filter', f"window of '{key}' must be an integer >= 1")
+                    continue
+            else:
+                _report(report, 'warning', None, 'telemetry_filter', f"unknown setting '{setting}' of '{key}' ignored")
+                continue
+            valid[setting] = value
+        filters[key] = valid
+    return filters, report
+
+
+def validate_config_items(panel_config_items_page: dict, config, return_item) -> list:
+    """
+    Check if all items of the page config exist
+
+    :param panel_config_items_page: dict of item paths per page
+    :param config:                  page config
+    :param return_item:             function returning the item of an item path or None
+    :return:                        report as list of dicts (see validate_panel_config)
+    """
+    report = []
+    for idx, items in panel_config_items_page.items():
+        for itemname in items:
+            if return_item(itemname) is None:
+                if idx == 0:
+                    # the screensaver is always needed, it is displayed without the value of the item
+                    _report(report, 'warning', idx, config[idx].get('entity'), f"{itemname} is not a valid item, the screensaver shows its name instead")
+                else:
+                    _report(report, 'error', idx, config[idx].get('entity'), f"{itemname} is not a valid item")
+    return report
+
+
+def read_yaml_source(path: str) -> tuple:
+    """
+    Read a yaml file without parsing it
+
+    :return:    tuple of (content, sha256 of the content)
+    """
+    with open(path, 'rb') as stream:
+        data = stream.read()
+    return data, hashlib.sha256(data).hexdigest()
+
+
+def parse_yaml(data: bytes):
+    return yaml.load(data, Loader=YAML_LOADER)
+
+
+# format of the compiled data in the cache file, increase when the layout of the compiled config or report changes
+COMPILED_FORMAT = 1
+
+
+def compiled_version() -> tuple:
+    """
+    Return the version of the compiled data, the format and a fingerprint of PAGE_SCHEMA, whose
+    defaults are part of the compiled config
+    """
+    schema = json.dumps(PAGE_SCHEMA, sort_keys=True, default=str).encode('utf-8')
+    return COMPILED_FORMAT, hashlib.sha1(schema).hexdigest()
+
+
+def load_compiled(cache_file: str, section: str, key):
+    """
+    Return the compiled data of a section of the cache file, if it was compiled for the given key
+    (content hash, compiled version and settings), otherwise None
+    """
+    try:
+        with open(cache_file, 'rb') as stream:
+            cache = pickle.load(stream)
+        entry = cache[section]
+    except Exception:
+        return None
+    return entry['data'] if entry.get('key') == key else None
+
+
+def save_compiled(cache_file: str, section: str, key, data) -> None:
+    """
+    Store the compiled data of a section in the cache file, other sections are kept
+    """
+    try:
+        with open(cache_file, 'rb') as stream:
+            cache = pickle.load(stream)
+        if not isinstance(cache, dict):
+            cache = {}
+    except Exception:
+        cache = {}
+    cache[section] = {'key': key, 'data': data}
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    tmp_file = f"{cache_file}.tmp"
+    with open(tmp_file, 'wb') as stream:
+        pickle.dump(cache, stream, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2022-      Michael Wenzel            wenzel_michael(a)web.de
+#                       Stefan Hauf               stefan.hauf(a)gmail.com
+#                       Christian Cordes          info(a)pol3cat.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Serialized execution of all state changes of a panel
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import asyncio
+import queue
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PanelActor(object):
+    """
+    Single consumer command queue of a panel. Item updates, panel messages and scheduler
+    callbacks are submitted as commands and executed one after another by the worker thread,
+    so the state of the panel (current page, last payload, panel status) is only changed by
+    this thread and can be read without locks.
+    """
+
+    _STOP = object()
+
+    # timers are managed by the scheduler of SmartHomeNG
+    has_timers = False
+
+    def __init__(self, name: str, logger, maxsize: int = 0):
+        self.name = name
+        self.logger = logger
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def in_actor(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        """
+        Execute all queued commands and stop the worker thread
+        """
+        if not self.running:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self.logger.warning(f"{self.name}: worker thread did not stop within {timeout}s")
+        self._thread = None
+
+    def submit(self, func, *args, **kwargs) -> None:
+        """
+        Queue a command. Commands submitted by a running command are executed directly,
+        commands submitted before start are queued until the actor is started.
+        """
+        if self.in_actor():
+            func(*args, **kwargs)
+        else:
+            self._queue.put((func, args, kwargs))
+
+    def wrap(self, func):
+        """
+        Return a function submitting func to the actor, e.g. to be used as scheduler callback
+        """
+        def submit_to_actor(*args, **kwargs):
+            self.submit(func, *args, **kwargs)
+        submit_to_actor.__name__ = getattr(func, '__name__', 'submit_to_actor')
+        return submit_to_actor
+
+    def debounce(self, key, delay: float, func, *args) -> None:
+        """
+        Commands are executed in order of submission, no debouncing
+        """
+        self.submit(func, *args)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        while True:
+            command = self._queue.get()
+            if command is self._STOP:
+                break
+            func, args, kwargs = command
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                self.logger.exception(f"{self.name}: command {getattr(func, '__name__', func)} failed: {e}")
+
+
+class AsyncioPanelEngine(object):
+    """
+    Panel engine running in an asyncio event loop. All engines share one loop thread for their
+    queues, timers and debouncing (instead of scheduler entries). Each engine serializes its
+    commands through its own queue consumed by a task of the loop, the commands themselves
+    run in a shared executor, so a blocking command (database query, MQTT publish) of one
+    panel does not stall the other panels. The interface for submitting commands is the same
+    as of PanelActor.
+    """
+
+    _STOP = object()
+
+    has_timers = True
+
+    _loop = None
+    _loop_thread = None
+    _loop_users = 0
+    _executor = None
+    _loop_lock = threading.Lock()
+
+    def __init__(self, name: str, logger):
+        self.name = name
+        self.logger = logger
+        self._queue = None
+        self._consumer = None
+        self._thread = None
+        self._pending = []
+        self._timers = {}
+        self._debounced = {}
+
+    @classmethod
+    def _acquire_loop(cls):
+        with cls._loop_lock:
+            if cls._loop is None:
+                cls._loop = asyncio.new_event_loop()
+                cls._loop_thread = threading.Thread(target=cls._loop.run_forever, name='plugins.nspanel.asyncio', daemon=True)
+                cls._loop_thread.start()
+                cls._executor = ThreadPoolExecutor(thread_name_prefix='plugins.nspanel.command')
+            cls._loop_users += 1
+            return cls._loop
+
+    @classmethod
+    def _release_loop(cls):
+        with cls._loop_lock:
+            cls._loop_users -= 1
+            if cls._loop_users > 0:
+                return
+            loop, thread, executor = cls._loop, cls._loop_thread, cls._executor
+            cls._loop = cls._loop_thread = cls._executor = None
+        executor.shutdown(wait=False)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        if not thread.is_alive():
+            loop.close()
+
+    @property
+    def running(self) -> bool:
+        return self._consumer is not None
+
+    def in_loop(self) -> bool:
+        return threading.current_thread() is self._loop_thread
+
+    def in_actor(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def start(self) -> None:
+        if self.running:
+            return
+        loop = self._acquire_loop()
+        asyncio.run_coroutine_threadsafe(self._start(), loop).result()
+
+    async def _start(self):
+        self._queue = asyncio.Queue()
+        self._consumer = asyncio.get_running_loop().create_task(self._consume())
+        for command in self._pending:
+            self._queue.put_nowait(command)
+        self._pending = []
+
+    def stop(self, timeout: float = 5) -> None:
+        """
+        Cancel timers, execute all queued commands and release the loop
+        """
+        if not self.running:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result(timeout)
+        except Exception as e:
+            self.logger.warning(f"{self.name}: engine did not stop within {timeout}s: {e}")
+        self._consumer = None
+        self._release_loop()
+
+    async def _stop(self):
+        for task in self._timers.values():
+            task.cancel()
+        self._timers.clear()
+        for handle in self._debounced.values():
+            handle.cancel()
+        self._debounced.clear()
+        self._queue.put_nowait(self._STOP)
+        await self._consumer
+
+    def submit(self, func, *args, **kwargs) -> None:
+        """
+        Queue a command. Commands submitted by a running command are executed directly,
+        commands submitted before start are queued until the engine is started.
+        """
+        if self.in_actor():
+            func(*args, **kwargs)
+            return
+        command = (func, args, kwargs)
+        if not self.running:
+            self._pending.append(command)
+        elif self.in_loop():
+            self._queue.put_nowait(command)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, command)
+
+    def wrap(self, func):
+        """
+        Return a function submitting func to the engine
+        """
+        def submit_to_actor(*args, **kwargs):
+            self.submit(func, *args, **kwargs)
+        submit_to_actor.__name__ = getattr(func, '__name__', 'submit_to_actor')
+        return submit_to_actor
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else len(self._pending)
+
+    def add_timer(self, name: str, func, delay: float, cycle: float = None, next_delay=None) -> None:
+        """
+        Submit func after delay seconds and then every cycle seconds (or after the seconds
+        returned by next_delay). An existing timer with the same name is replaced.
+        """
+        if self.running:
+            self._loop.call_soon_threadsafe(self._add_timer, name, func, delay, cycle, next_delay)
+
+    def remove_timer(self, name: str) -> None:
+        if self.running:
+            self._loop.call_soon_threadsafe(self._remove_timer, name)
+
+    def debounce(self, key, delay: float, func, *args) -> None:
+        """
+        Submit func after delay seconds. Further calls with the same key within delay
+        restart the delay, so only the last call is executed.
+        """
+        if self.running:
+            self._loop.call_soon_threadsafe(self._debounce, key, delay, func, args)
+        else:
+            self.submit(func, *args)
+
+    def _add_timer(self, name, func, delay, cycle, next_delay):
+        self._remove_timer(name)
+        self._timers[name] = self._loop.create_task(self._timer(func, delay, cycle, next_delay))
+
+    def _remove_timer(self, name):
+        task = self._timers.pop(name, None)
+        if task is not None:
+            task.cancel()
+
+    async def _timer(self, func, delay, cycle, next_delay):
+        await asyncio.sleep(delay)
+        while True:
+            self.submit(func)
+            if next_delay is not None:
+                wait = next_delay()
+            elif cycle:
+                wait = cycle
+            else:
+                return
+            await asyncio.sleep(wait)
+
+    def _debounce(self, key, delay, func, args):
+        handle = self._debounced.pop(key, None)
+        if handle is not None:
+            handle.cancel()
+        self._debounced[key] = self._loop.call_later(delay, self._fire, key, func, args)
+
+    def _fire(self, key, func, args):
+        self._debounced.pop(key, None)
+        self.submit(func, *args)
+
+    async def _consume(self):
+        while True:
+            command = await self._queue.get()
+            if command is self._STOP:
+                break
+            # the next command of this engine is started when the command finished
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._execute, *command)
+
+    def _execute(self, func, args, kwargs):
+        self._thread = threading.current_thread()
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            self.logger.exception(f"{self.name}: command {getattr(func, '__name__', func)} failed: {e}")
+        finally:
+            self._thread = None
+
+
+class StartupAdmission(object):
+    """
+    Admission of panels starting up, shared by all plugin instances. After a broker restart all panels
+    send LWT Online at the same time. Their initialization is started with a random jitter and only
+    max_concurrent panels are initialized at once, further panels wait for a free slot. A slot is
+    released when the panel finished its startup or after timeout seconds.
+    """
+
+    max_concurrent = 5
+    jitter = 3.0
+    timeout = 15.0
+
+    _lock = threading.Lock()
+    _waiting = OrderedDict()
+    _active = {}
+
+    _configured = False
+
+    @classmethod
+    def configure(cls, max_concurrent: int = None, jitter: float = None) -> bool:
+        """
+        Set the limits shared by all instances. Only the first instance configures them,
+        False is returned if a later instance requests different limits.
+        """
+        with cls._lock:
+            max_concurrent = cls.max_concurrent if max_concurrent is None else max(1, max_concurrent)
+            jitter = cls.jitter if jitter is None else max(0.0, jitter)
+            if cls._configured:
+                return (max_concurrent, jitter) == (cls.max_concurrent, cls.jitter)
+            cls.max_concurrent, cls.jitter = max_concurrent, jitter
+            cls._configured = True
+            return True
+
+    @classmethod
+    def request(cls, name: str, start) -> None:
+        """
+        Request the startup of a panel, start is called (from a timer thread) when it is admitted
+        """
+        with cls._lock:
+            cls._cancel(name)
+            cls._waiting[name] = start
+            cls._dispatch()
+
+    @classmethod
+    def release(cls, name: str) -> None:
+        """
+        Startup of a panel finished (or the panel went offline), admit the next waiting panel
+        """
+        with cls._lock:
+            cls._cancel(name)
+            cls._dispatch()
+
+    @classmethod
+    def state(cls) -> dict:
+        with cls._lock:
+            return {'active': sorted(cls._active), 'waiting': list(cls._waiting)}
+
+    @classmethod
+    def _cancel(cls, name):
+        cls._waiting.pop(name, None)
+        timers = cls._active.pop(name, None)
+        if timers is not None:
+            for timer in timers:
+                timer.cancel()
+
+    @classmethod
+    def _dispatch(cls):
+        while cls._waiting and len(cls._active) < cls.max_concurrent:
+            name, start = cls._waiting.popitem(last=False)
+            delay = random.uniform(0, cls.jitter)
+            timers = (threading.Timer(delay, start), threading.Timer(delay + cls.timeout, cls.release, (name,)))
+            for timer in timers:
+                timer.daemon = True
+                timer.start()
+            cls._active[name] = timers
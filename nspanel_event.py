@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2022-      Michael Wenzel            wenzel_michael(a)web.de
+#                       Stefan Hauf               stefan.hauf(a)gmail.com
+#                       Christian Cordes          info(a)pol3cat.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Parser of the events sent by the panel via CustomRecv
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import sys
+
+# fields of an event after 'event,<method>' and the number of required fields. The last field
+# takes the rest of the frame, so a value may contain commas.
+EVENT_LAYOUTS = {'buttonPress2': (('page', 'action', 'value'), 2),   # event,buttonPress2,entity,action[,value]
+                 'pageOpenDetail': (('action', 'page'), 2),         # event,pageOpenDetail,popupLight,entity
+                 'startup': (('value', 'page'), 2),                 # event,startup,version,model
+                 'sleepReached': (('page',), 0),                    # event,sleepReached,cardEntities
+                 'screensaverOpen': ((), 0),                        # event,screensaverOpen
+                 'button1': (('value',), 0),                        # event,button1[,state]
+                 'button2': (('value',), 0),                        # event,button2[,state]
+                 }
+
+# actions of buttonPress2 with an integer value
+NUMBER_ACTIONS = {'OnOff', 'number-set', 'positionSlider', 'tiltSlider', 'brightnessSlider', 'colorTempSlider',
+                  'tempUpd', 'hvac_action', 'volumeSlider'}
+
+# actions with an option appended to their name, e.g. alarm-mode2 or media-pause
+ACTION_PREFIXES = ('alarm-mode', 'media-', 'mode-', 'timer-')
+
+
+class PanelEvent:
+    """
+    Event of the panel, parsed once when it is received. Method and action are interned, so
+    handlers compare them cheaply. number is the value converted to int, None if it is no integer.
+    option is the part of the action following its prefix (e.g. '2' of alarm-mode2).
+    """
+
+    __slots__ = ('type', 'method', 'page', 'action', 'value', 'number', 'option')
+
+    def __init__(self, method: str, page: str = None, action: str = None, value: str = None):
+        self.type = 'event'
+        self.method = method
+        self.page = page
+        self.action = action
+        self.value = value
+        self.number = None
+        self.option = None
+        if value is not None:
+            try:
+                self.number = int(value)
+            except ValueError:
+                pass
+        if action is not None:
+            prefix = next((prefix for prefix in ACTION_PREFIXES if action.startswith(prefix)), None)
+            if prefix is not None:
+                self.option = action[len(prefix):]
+
+    def __repr__(self):
+        return f"PanelEvent(method={self.method}, page={self.page}, action={self.action}, value={self.value})"
+
+
+def parse_event(payload: str):
+    """
+    Parse a CustomRecv frame of the panel in one pass
+
+    :param payload:     frame like 'event,buttonPress2,licht.eg.tv,OnOff,1'
+    :return:            PanelEvent, None if the frame is malformed or of an unknown method
+    """
+    if not isinstance(payload, str):
+        return None
+    typ, _, rest = payload.partition(',')
+    method, _, rest = rest.partition(',')
+    layout = EVENT_LAYOUTS.get(method)
+    if typ != 'event' or layout is None:
+        return None
+
+    names, required = layout
+    fields = rest.split(',', len(names) - 1) if rest else []
+    if len(fields) < required or len(fields) > len(names):
+        return None
+    values = dict(zip(names, fields))
+    if 'action' in values:
+        values['action'] = sys.intern(values['action'])
+    event = PanelEvent(sys.intern(method), **values)
+    if method == 'buttonPress2' and event.number is None and (event.action in NUMBER_ACTIONS or event.action.startswith('mode-')):
+        return None
+    return event
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2022-      Michael Wenzel            wenzel_michael(a)web.de
+#                       Stefan Hauf               stefan.hauf(a)gmail.com
+#                       Christian Cordes          info(a)pol3cat.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Byte budgets of the frames sent to the panel via CustomSend
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+import threading
+from collections import OrderedDict
+
+# Tasmota limits the payload of a command and the berry driver forwards the frame as one
+# serial message to the display. Frames exceeding the budget are silently dropped by the panel.
+DEFAULT_FRAME_BUDGET = 1000
+FRAME_BUDGETS = {'entityUpd': 1000,
+                 'weatherUpdate': 1000,
+                 'entityUpdateDetail': 500,
+                 'entityUpdateDetail2': 500,
+                 'notify': 500,
+                 }
+
+# frames switching the page of the panel, the panel resets the content of all other channels
+PAGE_FRAMES = ('pageType', 'exitPopup')
+# frames the panel executes every time, they are never suppressed
+COMMAND_FRAMES = ('exitPopup',)
+# settings of the panel kept across page switches
+PERSISTENT_CHANNELS = ('timeout', 'dimmode')
+
+# positions of the display texts within the frames, all other fields are protocol tokens (entity types,
+# internal names, icons, colors, navigation) and are never truncated
+WEATHER_FIELDS = 6          # ignore~ignore~icon~iconColor~heading~text
+NOTIFY_DETAIL_FIELDS = 14   # entityUpdateDetail~entity~heading~color~buttonLeft~color~buttonRight~color~text~...
+
+# text positions of the entityUpd frame per pageType as tuple of (fixed indices, index of the first entity,
+# fields per entity, text offsets within an entity). The heading is followed by 12 navigation fields.
+PAGE_TEXT_FIELDS = {
+    # heading, entities type~internalName~icon~iconColor~displayName~value
+    'cardEntities': ((1,), 14, 6, (4,)),
+    'cardGrid': ((1,), 14, 6, (4,)),
+    # heading, title, author, entities type~internalName~icon~iconColor~displayName~ignore
+    'cardMedia': ((1, 15, 17), 23, 6, (4,)),
+    # heading, state
+    'cardThermo': ((1, 17), None, 0, ()),
+    # title
+    'cardAlarm': ((1,), None, 0, ()),
+    'cardUnlock': ((1,), None, 0, ()),
+    # heading, display names of SSID and password, the QR text and the values are kept
+    'cardQR': ((1, 19, 25), None, 0, ()),
+    # heading, text below and above home, entities ignore~ignore~icon~iconColor~name~value~speed
+    'cardPower': ((1, 19, 26), 28, 7, (4, 5)),
+    # heading, yAxisLabel
+    'cardChart': ((1, 15), None, 0, ()),
+    'cardLChart': ((1, 15), None, 0, ()),
+}
+
+# text fields are never truncated below this number of bytes
+TRUNCATE_MIN_BYTES = 8
+ELLIPSIS = '…'
+
+
+def frame_type(frame: str) -> str:
+    return frame.split('~', 1)[0]
+
+
+def frame_budget(frame: str) -> int:
+    return FRAME_BUDGETS.get(frame_type(frame), DEFAULT_FRAME_BUDGET)
+
+
+def frame_size(frame: str) -> int:
+    """
+    Return the size of the frame in bytes as sent to the panel (mdi glyphs need 3 bytes in UTF-8)
+    """
+    return len(frame.encode('utf-8'))
+
+
+def truncate_utf8(text: str, max_bytes: int) -> str:
+    """
+    Truncate text to max_bytes without splitting a multi-byte character
+    """
+    return text.encode('utf-8')[:max_bytes].decode('utf-8', 'ignore')
+
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def text_fields(fields: list, page_type: str = None) -> list:
+    """
+    Return the indices of the display texts of a frame split into its fields. The layout of
+    entityUpd depends on the pageType of the displayed page.
+    """
+    kind = fields[0]
+    if kind == 'entityUpd':
+        if page_type not in PAGE_TEXT_FIELDS:
+            return []
+        fixed, first, size, offsets = PAGE_TEXT_FIELDS[page_type]
+        indices = [idx for idx in fixed if idx < len(fields)]
+        if first is not None:
+            for start in range(first, len(fields) - size + 1, size):
+                indices.extend(start + offset for offset in offsets)
+                if page_type in ('cardEntities', 'cardGrid') and fields[start] == 'text':
+                    # value of a text entity
+                    indices.append(start + 5)
+        return indices
+    if kind == 'weatherUpdate':
+        return [idx for start in range(1, len(fields) - WEATHER_FIELDS + 1, WEATHER_FIELDS)
+                for idx in (start + 4, start + 5)]
+    if kind == 'entityUpdateDetail' and len(fields) == NOTIFY_DETAIL_FIELDS:
+        return [2, 8]
+    if kind == 'notify':
+        return [1, 2]
+    return []
+
+
+def protected_fields(config) -> set:
+    """
+    Return the internal names of all entities of the page config. The panel returns them with
+    its events, so they must never be truncated.
+    """
+    names = set()
+    for card in config or []:
+        if not isinstance(card, dict):
+            continue
+        names.add(card.get('entity'))
+        for entity in card.get('entities') or []:
+            if isinstance(entity, dict):
+                names.add(entity.get('entity'))
+    names.discard(None)
+    return names
+
+
+def fit_frame(frame: str, budget: int = None, protected=(), page_type: str = None) -> tuple:
+    """
+    Shorten the display texts of a frame exceeding its budget, longest field first. Only the text
+    positions of known frame types are shortened (see text_fields), numbers, short fields and protected
+    internal names are kept, so the frame structure is unchanged.
+
+    :param frame:       frame as sent to the panel, fields separated by '~'
+    :param budget:      max size in bytes, default is the budget of the message type
+    :param protected:   field values not to be truncated
+    :param page_type:   pageType of the displayed page, determines the layout of entityUpd
+    :return:            tuple of (frame, truncated). The frame may still exceed the budget,
+                        if there is not enough text to truncate.
+    """
+    budget = budget or frame_budget(frame)
+    excess = frame_size(frame) - budget
+    if excess <= 0:
+        return frame, False
+
+    fields = frame.split('~')
+    sizes = [frame_size(field) for field in fields]
+    candidates = [idx for idx in text_fields(fields, page_type)
+                  if sizes[idx] > TRUNCATE_MIN_BYTES and fields[idx] not in protected and not _is_number(fields[idx])]
+
+    ellipsis_size = frame_size(ELLIPSIS)
+    truncated = False
+    while excess > 0 and candidates:
+        candidates.sort(key=lambda i: sizes[i], reverse=True)
+        idx = candidates[0]
+        # shorten the longest field down to the length of the next longest one first
+        floor = sizes[candidates[1]] if len(candidates) > 1 else 0
+        target = max(TRUNCATE_MIN_BYTES, sizes[idx] - excess, floor)
+        if target >= sizes[idx]:
+            target = max(TRUNCATE_MIN_BYTES, sizes[idx] - excess)
+        if target >= sizes[idx]:
+            candidates.pop(0)
+            continue
+
+        text = fields[idx].rstrip(ELLIPSIS)
+        fields[idx] = truncate_utf8(text, target - ellipsis_size) + ELLIPSIS
+        new_size = frame_size(fields[idx])
+        excess -= sizes[idx] - new_size
+        sizes[idx] = new_size
+        truncated = True
+        if new_size <= TRUNCATE_MIN_BYTES:
+            candidates.pop(0)
+
+    return '~'.join(fields), truncated
+
+
+class FrameCache:
+    """
+    Last frame sent to the panel per channel (message type like pageType, entityUpd, weatherUpdate, color,
+    statusUpdate, time, date or dimmode) to suppress frames not changing what the panel displays
+    """
+
+    def __init__(self):
+        self.frames = {}
+
+    def unchanged(self, frame: str) -> bool:
+        return self.frames.get(frame_type(frame)) == frame
+
+    def sent(self, frame: str) -> None:
+        """
+        Record a frame sent to the panel, a page switch resets the content of the other channels
+        """
+        channel = frame_type(frame)
+        if channel in PAGE_FRAMES:
+            self.invalidate()
+        if channel not in COMMAND_FRAMES:
+            self.frames[channel] = frame
+
+    def invalidate(self, persistent: bool = False) -> None:
+        """
+        Forget the frames of the displayed page, e.g. if the panel switched the page on its own.
+        With persistent, the settings are forgotten too (panel restarted or state unknown).
+        """
+        self.frames = {channel: frame for channel, frame in self.frames.items()
+                       if not persistent and channel in PERSISTENT_CHANNELS}
+
+    def page_type(self):
+        """
+        Return the pageType of the displayed page, None if unknown
+        """
+        frame = self.frames.get('pageType')
+        return frame.split('~')[1] if frame is not None and '~' in frame else None
+
+    def page_frames(self) -> list:
+        """
+        Return the frames of the displayed page, starting with its pageType
+        """
+        return [frame for channel, frame in self.frames.items() if channel not in PERSISTENT_CHANNELS]
+
+
+class SharedFrameCache:
+    """
+    Frames built from the same config and the same item values are identical for all panels, e.g. the
+    screensaver of a fleet of panels. They are built once and shared by all plugin instances.
+    """
+
+    maxsize = 32
+
+    _lock = threading.Lock()
+    _frames = OrderedDict()
+    stats = {'hits': 0, 'misses': 0}
+
+    @classmethod
+    def get(cls, key, build):
+        """
+        Return the frames cached for key, build and cache them if missing
+
+        :param key:     hashable key of everything the frames are built of
+        :param build:   function returning the frames
+        """
+        with cls._lock:
+            frames = cls._frames.get(key)
+            if frames is not None:
+                cls._frames.move_to_end(key)
+                cls.stats['hits'] += 1
+                return frames
+        frames = build()
+        with cls._lock:
+            cls.stats['misses'] += 1
+            cls._frames[key] = frames
+            while len(cls._frames) > cls.maxsize:
+                cls._frames.popitem(last=False)
+        return frames
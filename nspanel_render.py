@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2022-      Michael Wenzel            wenzel_michael(a)web.de
+#                       Stefan Hauf               stefan.hauf(a)gmail.com
+#                       Christian Cordes          info(a)pol3cat.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Item lookup and value snapshots used while rendering pages
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+# languages using a decimal comma
+DECIMAL_COMMA_LANGUAGES = ['cs', 'da', 'de', 'es', 'fi', 'fr', 'it', 'nb', 'nl', 'pl', 'pt', 'ru', 'sv', 'tr']
+
+# keys of an entity (or page) defining the format of its value
+FORMAT_KEYS = ['precision', 'unit', 'decimalSeparator']
+
+
+def decimal_separator(language: str) -> str:
+    """
+    Return the decimal separator of a language like 'de-DE'
+    """
+    return ',' if str(language).split('-')[0].lower() in DECIMAL_COMMA_LANGUAGES else '.'
+
+
+def format_spec(config: dict, default_separator: str = '.'):
+    """
+    Return the format spec of an entity or page config, or None if it does not define one
+    """
+    if not any(key in config for key in FORMAT_KEYS):
+        return None
+    return {'precision': config.get('precision'),
+            'unit': config.get('unit', ''),
+            'decimalSeparator': config.get('decimalSeparator') or default_separator}
+
+
+def format_value(value, spec: dict) -> str:
+    """
+    Format a value as displayed: numbers rounded to precision with the decimal separator
+    of the spec, followed by the unit
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        precision = spec.get('precision')
+        text = f"{value:.{precision}f}" if precision is not None else str(value)
+        separator = spec.get('decimalSeparator') or '.'
+        if separator != '.':
+            text = text.replace('.', separator)
+    else:
+        text = str(value)
+    unit = spec.get('unit')
+    return f"{text} {unit}" if unit else text
+
+
+class FormatCache(object):
+    """
+    Formatted value per item path. The formatted string is cached together with the raw
+    value, so formatting is only done again if the raw value changed.
+    """
+
+    def __init__(self):
+        self.specs = {}
+        self._cache = {}
+
+    def set_specs(self, specs: dict) -> None:
+        self.specs = specs
+        self._cache.clear()
+
+    def format(self, path, value) -> str:
+        cached = self._cache.get(path)
+        if cached is not None and type(cached[0]) is type(value) and cached[0] == value:
+            return cached[1]
+        spec = self.specs.get(path)
+        text = format_value(value, spec) if spec is not None else str(value)
+        # only immutable values can be compared later on
+        if isinstance(value, (int, float, str, bool)):
+            self._cache[path] = (value, text)
+        return text
+
+
+class ItemIndex(object):
+    """
+    Resolved items by path. Each path is looked up in the item registry of SmartHomeNG only once,
+    also paths not being an item (e.g. texts or icon names of the page config).
+    """
+
+    def __init__(self, return_item):
+        self._return_item = return_item
+        self._items = {}
+
+    def get(self, path):
+        if not isinstance(path, str) or not path:
+            return None
+        try:
+            return self._items[path]
+        except KeyError:
+            item = self._items[path] = self._return_item(path)
+            return item
+
+    def resolve(self, paths) -> list:
+        return [self.get(path) for path in paths]
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class RenderContext(object):
+    """
+    Snapshot of the item values of a page. All values are read in one batch when the context
+    is created, so a frame is built from values of the same point in time.
+    """
+
+    __slots__ = ('page', 'values')
+
+    def __init__(self, page, paths, item_index: ItemIndex):
+        self.page = page
+        self.values = {}
+        for path in paths:
+            item = item_index.get(path)
+            if item is not None:
+                self.values[path] = item()
+
+    def get(self, path, default=None):
+        return self.values.get(path, default)
+
+    def __contains__(self, path):
+        return path in self.values
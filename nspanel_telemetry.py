@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# vim: set encoding=utf-8 tabstop=4 softtabstop=4 shiftwidth=4 expandtab
+#########################################################################
+#  Copyright 2022-      Michael Wenzel            wenzel_michael(a)web.de
+#                       Stefan Hauf               stefan.hauf(a)gmail.com
+#                       Christian Cordes          info(a)pol3cat.de
+#########################################################################
+#  This file is part of SmartHomeNG.
+#
+#  Filtering of the telemetry of the panel before it is written to items
+#
+#  SmartHomeNG is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  SmartHomeNG is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with SmartHomeNG. If not, see <http://www.gnu.org/licenses/>.
+#
+#########################################################################
+
+
+import time
+from array import array
+from collections import deque
+
+SMOOTHING = ('none', 'ema', 'average')
+
+# defaults per telemetry value (nspanel_attr of the item), overwritten by plugin parameter telemetry_filter
+DEFAULT_FILTER = {'deadband': 0, 'min_interval': 0, 'smoothing': 'none', 'alpha': 0.3, 'window': 5}
+# all values are written unfiltered unless configured
+DEFAULT_FILTERS = {'temp_analog': {},
+                   'temp_esp32': {},
+                   'wifi_signal': {},
+                   }
+
+# health metrics of the panel and their path within the STATE telegram of Tasmota
+HEALTH_METRICS = {'heap': ('Heap',),
+                  'load_avg': ('LoadAvg',),
+                  'sleep': ('Sleep',),
+                  'mqtt_count': ('MqttCount',),
+                  'berry_heap_used': ('Berry', 'HeapUsed'),
+                  'berry_objects': ('Berry', 'Objects'),
+                  'wifi_downtime': ('Wifi', 'Downtime'),
+                  }
+
+
+class TelemetryFilter:
+    """
+    Decide which telemetry values of the panel are significant enough to be written to items.
+    Values are optionally smoothed (exponential or moving average), a value is written if it differs
+    by at least deadband from the value written last and min_interval seconds have passed since then.
+    """
+
+    def __init__(self, config: dict = None):
+        self.filters = {}
+        self.state = {}
+        self.configure(config or {})
+
+    def configure(self, config: dict) -> None:
+        self.filters = {key: dict(DEFAULT_FILTER, **DEFAULT_FILTERS.get(key, {}), **config.get(key, {}))
+                        for key in set(DEFAULT_FILTERS) | set(config)}
+        self.state.clear()
+
+    def update(self, values: dict, now: float = None) -> dict:
+        """
+        Process all values of one telegram in one pass
+
+        :param values:  dict of telemetry key to raw value
+        :param now:     timestamp of the telegram, default is the current time
+        :return:        dict of telemetry key to value to be written
+        """
+        now = time.time() if now is None else now
+        result = {}
+        for key, value in values.items():
+            value = self._filter(key, value, now)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def _filter(self, key: str, value, now: float):
+        config = self.filters.get(key)
+        if config is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+            return value
+
+        state = self.state.get(key)
+        if state is None:
+            state = self.state[key] = {'written': None, 'time': None, 'ema': None,
+                                       'window': deque(maxlen=config['window'])}
+
+        if config['smoothing'] == 'ema':
+            state['ema'] = value if state['ema'] is None else state['ema'] + config['alpha'] * (value - state['ema'])
+            value = state['ema']
+        elif config['smoothing'] == 'average':
+            state['window'].append(value)
+            value = sum(state['window']) / len(state['window'])
+        if isinstance(value, float):
+            value = round(value, 2)
+
+        if state['written'] is not None:
+            # deadband 0 passes every value, also unchanged ones (enforce_updates of the items)
+            if abs(value - state['written']) < config['deadband']:
+                return None
+            if now - state['time'] < config['min_interval']:
+                return None
+        state['written'] = value
+        state['time'] = now
+        return value
+
+
+def parse_duration(value) -> float:
+    """
+    Convert a Tasmota duration like '1T02:03:04' to seconds
+    """
+    if isinstance(value, (int, float)):
+        return value
+    days, _, clock = str(value).rpartition('T')
+    hours, minutes, seconds = (int(part) for part in clock.split(':'))
+    return (int(days) if days else 0) * 86400 + hours * 3600 + minutes * 60 + seconds
+
+
+class RingBuffer:
+    """
+    Fixed window of the last values of a metric, stored in an array of doubles
+    """
+
+    def __init__(self, size: int):
+        self.values = array('d', bytes(8 * size))
+        self.size = size
+        self.count = 0
+        self.pos = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value: float) -> None:
+        self.values[self.pos] = value
+        self.pos = (self.pos + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def last(self):
+        return self.values[self.pos - 1] if self.count else None
+
+    def to_list(self) -> list:
+        """
+        Return the values of the window, oldest first
+        """
+        if self.count < self.size:
+            return self.values[:self.count].tolist()
+        return self.values[self.pos:].tolist() + self.values[:self.pos].tolist()
+
+    def rollup(self) -> dict:
+        if not self.count:
+            return {'count': 0, 'min': None, 'avg': None, 'max': None, 'last': None}
+        values = self.values if self.count == self.size else self.values[:self.count]
+        return {'count': self.count, 'min': min(values), 'avg': round(sum(values) / self.count, 2),
+                'max': max(values), 'last': self.last()}
+
+
+class PanelHealth:
+    """
+    Health metrics of a panel taken from its STATE telegrams, to correlate a sluggish panel
+    with heap exhaustion, load or Wi-Fi drops
+    """
+
+    def __init__(self, window: int):
+        self.buffers = {metric: RingBuffer(window) for metric in HEALTH_METRICS}
+
+    def update(self, payload: dict) -> dict:
+        """
+        Capture the health metrics of a STATE telegram
+
+        :param payload:     STATE telegram
+        :return:            dict of metric to value of all metrics contained in the telegram
+        """
+        values = {}
+        for metric, path in HEALTH_METRICS.items():
+            value = payload
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            if value is None:
+                continue
+            try:
+                value = parse_duration(value) if metric == 'wifi_downtime' else float(value)
+            except (TypeError, ValueError):
+                continue
+            self.buffers[metric].append(value)
+            values[metric] = value
+        return values
+
+    def rollups(self) -> dict:
+        return {metric: buffer.rollup() for metric, buffer in self.buffers.items()}